@@ -8,5 +8,7 @@ if __name__ == "__main__":
     arrays = list_zarr_arrays(url)
     assert len(arrays) != 0
 
-    summary = inspect_zarr_store(url)
+    # Read through a local block cache so metadata files read again, e.g.
+    # by the listing and the summary, are not fetched a second time
+    summary = inspect_zarr_store(url, cache="block")
     print(json.dumps(summary, indent=4))
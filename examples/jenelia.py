@@ -3,14 +3,14 @@ import sys
 import pyvista as pv
 
 from zarr_utils.convert import wrap_vtk
-from zarr_utils.inspect import list_zarr_arrays
+from zarr_utils.inspect import _sizeof_fmt, list_zarr_arrays
 from zarr_utils.xarray import open_xarray
 
 
 def prompt_for_choice(arrays):
     print("\nAvailable arrays:")
     for i, arr in enumerate(arrays):
-        print(f"[{i}] {arr['path']:40s}  {arr['shape']}  {arr['dtype']}  {arr['size_bytes'] / 1e6:.2f} MB")
+        print(f"[{i}] {arr['path']:40s}  {arr['shape']}  {arr['dtype']}  {_sizeof_fmt(arr['size_bytes'])}")
 
     while True:
         try:
@@ -0,0 +1,25 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def rng():
+    """Seeded random generator shared by the test session."""
+    return np.random.default_rng(0)
+
+
+@pytest.fixture(scope="session")
+def session_tmp(tmp_path_factory):
+    """Temporary directory shared by the test session, removed by pytest."""
+    return str(tmp_path_factory.mktemp("stores"))
+
+
+@pytest.fixture
+def store_dir(session_tmp):
+    """Fresh subdirectory of the session directory for a single test."""
+    path = os.path.join(session_tmp, uuid.uuid4().hex)
+    os.mkdir(path)
+    return path
@@ -1,16 +1,24 @@
 """Test compatibility with both Zarr v2 and v3."""
 import tempfile
+import uuid
 from pathlib import Path
 
+import fsspec
 import numpy as np
+import pytest
 import zarr
 
+import zarr_utils.compat
 from zarr_utils import list_zarr_arrays, open_xarray
 from zarr_utils.compat import (
     IS_ZARR_V3,
+    _default_chunks,
+    batch_get_metadata,
     consolidate_metadata,
+    consolidate_metadata_fast,
     create_array_compat,
     get_array_compressor,
+    json_loads,
     open_array_with_storage_options,
 )
 
@@ -44,6 +52,84 @@ class TestZarrCompat:
             assert arr2.shape == (5, 5)
             assert arr2.dtype == np.float32
 
+    def test_default_chunks_target_bytes(self):
+        """Test that default chunks hold about 2 MiB regardless of dtype."""
+
+        # Trailing axes are filled first, the axis that overflows is cut short
+        assert _default_chunks((4000, 1000), np.float64) == (262, 1000)
+        assert _default_chunks((4000, 1000), np.int8) == (2097, 1000)
+        assert _default_chunks((50, 4000, 4000), np.uint16) == (1, 262, 4000)
+
+        # Arrays smaller than the target are a single chunk
+        assert _default_chunks((10, 20), np.float32) == (10, 20)
+        assert _default_chunks((0,), np.float32) == (1,)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = zarr.open_group(str(Path(temp_dir) / "test.zarr"), mode="w")
+            arr = create_array_compat(store, "data", data=np.zeros((3000, 1000), dtype="u1"))
+            assert arr.chunks == (2097, 1000)
+
+    def test_fill_value_data_not_written(self):
+        """Test that data holding only the fill value writes no chunks."""
+        metadata_files = {".zarray", ".zattrs", ".zgroup", "zarr.json"}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = Path(temp_dir) / "test.zarr"
+            store = zarr.open_group(str(store_path), mode="w")
+
+            zeros = create_array_compat(store, "zeros", data=np.zeros((4, 4)), chunks=(2, 2))
+            ones = create_array_compat(store, "ones", data=np.ones((4, 4)), chunks=(2, 2))
+
+            def chunk_files(name):
+                fs = fsspec.filesystem("file")
+                return [p for p in fs.find(str(store_path / name)) if p.rsplit("/", 1)[-1] not in metadata_files]
+
+            assert chunk_files("zeros") == []
+            assert len(chunk_files("ones")) == 4
+            np.testing.assert_array_equal(zeros[:], np.zeros((4, 4)))
+            np.testing.assert_array_equal(ones[:], np.ones((4, 4)))
+
+    def test_fill_value_check_by_slab(self, monkeypatch):
+        """Test that values past the first slab are still found."""
+        monkeypatch.setattr(zarr_utils.compat, "_FILL_CHECK_ELEMENTS", 8)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = zarr.open_group(str(Path(temp_dir) / "test.zarr"), mode="w")
+
+            data = np.zeros((6, 4))
+            data[5, 3] = 1.0
+            arr = create_array_compat(store, "data", data=data, chunks=(2, 2))
+            np.testing.assert_array_equal(arr[:], data)
+
+    def test_create_array_compat_dask_data(self):
+        """Test that dask arrays are written like NumPy input."""
+        da = pytest.importorskip("dask.array")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = zarr.open_group(str(Path(temp_dir) / "test.zarr"), mode="w")
+
+            data = da.arange(24, chunks=6).reshape(4, 6)
+            arr = create_array_compat(store, "data", data=data, chunks=(2, 3))
+            np.testing.assert_array_equal(arr[:], data.compute())
+
+            zeros = create_array_compat(store, "zeros", data=da.zeros((4, 6), chunks=2))
+            np.testing.assert_array_equal(zeros[:], np.zeros((4, 6)))
+
+            # Zarr arrays are accepted as input too
+            copy = create_array_compat(store, "copy", data=arr, chunks=(2, 3))
+            np.testing.assert_array_equal(copy[:], data.compute())
+
+    def test_create_array_compat_parallel_write(self, monkeypatch):
+        """Test that parallel chunk writes store the same data."""
+        monkeypatch.setenv("ZARR_UTILS_PARALLEL_WRITE", "1")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = zarr.open_group(str(Path(temp_dir) / "test.zarr"), mode="w")
+
+            # Uneven edge chunks exercise the partial slabs
+            data = np.arange(23 * 17, dtype="i4").reshape(23, 17)
+            arr = create_array_compat(store, "data", data=data, chunks=(5, 4))
+
+            assert arr.chunks == (5, 4)
+            np.testing.assert_array_equal(arr[:], data)
+
     def test_open_with_storage_options(self):
         """Test opening arrays/groups with storage options."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -78,7 +164,6 @@ class TestZarrCompat:
 
             # Consolidate
             try:
-                import fsspec
                 mapper = fsspec.get_mapper(str(store_path))
                 consolidate_metadata(mapper)
 
@@ -88,6 +173,49 @@ class TestZarrCompat:
                 # Some versions might not support it fully
                 print(f"Consolidation not fully supported: {e}")
 
+    @pytest.mark.parametrize("local", [True, False])
+    def test_consolidate_metadata_fast(self, local, tmp_path):
+        """Test batched consolidation produces a store zarr can open."""
+        store_path = str(tmp_path / "test.zarr") if local else f"memory://{uuid.uuid4().hex}/test.zarr"
+
+        store = zarr.open_group(store_path, mode="w", **({"zarr_format": 2} if IS_ZARR_V3 else {}))
+        store.attrs["title"] = "fast"
+        create_array_compat(store.create_group("g"), "data", data=np.arange(100), chunks=(10,))
+
+        consolidated = consolidate_metadata_fast(store_path)
+
+        assert consolidated["zarr_consolidated_format"] == 1
+        assert set(consolidated["metadata"]) >= {".zgroup", ".zattrs", "g/.zgroup", "g/data/.zarray"}
+        assert consolidated["metadata"][".zattrs"] == {"title": "fast"}
+
+        root = zarr.open_consolidated(store_path, mode="r")
+        assert root["g/data"].shape == (100,)
+
+    @pytest.mark.skipif(not IS_ZARR_V3, reason="Zarr v2 cannot write v3 format stores")
+    def test_consolidate_metadata_fast_skips_v3_format(self):
+        """Test that v3 format stores are left to zarr's own consolidation."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = Path(temp_dir) / "test.zarr"
+            create_array_compat(zarr.open_group(str(store_path), mode="w"), "data", data=np.arange(10))
+
+            assert consolidate_metadata_fast(str(store_path)) is None
+            assert not (store_path / ".zmetadata").exists()
+
+    def test_batch_get_metadata(self):
+        """Test that metadata documents are fetched and parsed in one batch."""
+        fs = fsspec.filesystem("memory")
+        root = f"/{uuid.uuid4().hex}"
+        fs.pipe({f"{root}/.zgroup": b'{"zarr_format": 2}', f"{root}/a/.zattrs": b'{"units": "nm"}'})
+
+        docs = batch_get_metadata(fs, [f"{root}/.zgroup", f"{root}/a/.zattrs", f"{root}/b/.zattrs"])
+        assert docs == {f"{root}/.zgroup": {"zarr_format": 2}, f"{root}/a/.zattrs": {"units": "nm"}}
+        assert batch_get_metadata(fs, []) == {}
+
+    def test_json_loads_non_finite(self):
+        """Test that documents with bare NaN values still parse."""
+        assert json_loads(b'{"units": "nm"}') == {"units": "nm"}
+        assert np.isnan(json_loads(b'{"fill_value": NaN}')["fill_value"])
+
     def test_list_arrays_works(self):
         """Test that list_zarr_arrays works with current version."""
         with tempfile.TemporaryDirectory() as temp_dir:
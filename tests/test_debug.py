@@ -1,18 +1,23 @@
-import shutil
+import os
 import tempfile
 import time
+import uuid
 from pathlib import Path
 
+import fsspec
 import numpy as np
 import pytest
 import zarr
 
+import zarr_utils.debug
+import zarr_utils.inspect
 from zarr_utils.compat import create_array_compat
 from zarr_utils.debug import (
     ZarrDebugger,
     diagnose_zarr_store,
     enable_debug_mode,
     explain_zarr_error,
+    invalidate_diagnose_cache,
 )
 
 
@@ -27,8 +32,8 @@ class TestZarrDebugger:
             time.sleep(0.1)  # Simulate work
 
         assert len(debugger.operation_times) == 1
-        assert debugger.operation_times[0]["success"] is True
-        assert debugger.operation_times[0]["duration"] >= 0.1
+        assert debugger.operation_times[0].success is True
+        assert debugger.operation_times[0].duration >= 0.1
 
         captured = capsys.readouterr()
         assert "Starting: Test operation" in captured.out
@@ -43,8 +48,8 @@ class TestZarrDebugger:
                 raise ValueError("Test error")
 
         assert len(debugger.operation_times) == 1
-        assert debugger.operation_times[0]["success"] is False
-        assert "error" in debugger.operation_times[0]
+        assert debugger.operation_times[0].success is False
+        assert debugger.operation_times[0].error == "Test error"
 
         captured = capsys.readouterr()
         assert "Failed: Failing operation" in captured.out
@@ -59,6 +64,16 @@ class TestZarrDebugger:
         captured = capsys.readouterr()
         assert captured.out == ""  # No output in quiet mode
 
+    def test_operation_history_bounded(self):
+        """Test that only the most recent operations are kept."""
+        debugger = ZarrDebugger(verbose=False, maxlen=2)
+
+        for name in ("Op1", "Op2", "Op3"):
+            with debugger.operation(name):
+                pass
+
+        assert [op.name for op in debugger.operation_times] == ["Op2", "Op3"]
+
     def test_summarize(self, capsys):
         """Test operation summary."""
         debugger = ZarrDebugger(verbose=False)
@@ -88,38 +103,59 @@ class TestZarrDebugger:
         assert "Error: Error" in captured.out
 
 
+@pytest.fixture(scope="session")
+def temp_zarr_store():
+    """Create an in-memory test Zarr store shared across the test session."""
+    store_url = f"memory://{uuid.uuid4().hex}/test.zarr"
+
+    store = zarr.open_group(store_url, mode="w")
+    store.attrs["description"] = "Test store"
+
+    # Add some arrays. The contents only need to differ from the fill value so
+    # that chunks are actually stored for the read and bandwidth checks.
+    data1 = np.ones((100, 100))
+    arr1 = create_array_compat(
+        store, "data1", data=data1, chunks=(50, 50)
+    )
+    arr1.attrs["units"] = "meters"
+
+    group1 = store.create_group("subgroup")
+    data2 = np.ones((50, 50, 50))
+    create_array_compat(
+        group1, "data2", data=data2, chunks=(25, 25, 25)
+    )
+
+    # Consolidate once so opens in the tests read a single metadata document
+    zarr.consolidate_metadata(store_url)
+
+    yield store_url
+
+    fsspec.filesystem("memory").rm(store_url, recursive=True)
+
+
 class TestDiagnoseZarrStore:
     """Test Zarr store diagnostics."""
 
     @pytest.fixture
-    def temp_zarr_store(self):
-        """Create a test Zarr store."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "test.zarr"
+    def local_zarr_store(self, store_dir):
+        """Create an unconsolidated Zarr store on the local filesystem."""
+        store_path = os.path.join(store_dir, "test.zarr")
 
-        store = zarr.open_group(str(store_path), mode="w")
+        store = zarr.open_group(store_path, mode="w")
         store.attrs["description"] = "Test store"
 
         # Add some arrays
-        data1 = np.random.rand(100, 100)
-        arr1 = create_array_compat(
-            store, "data1", data=data1, chunks=(50, 50)
-        )
+        arr1 = create_array_compat(store, "data1", data=np.ones((100, 100)), chunks=(50, 50))
         arr1.attrs["units"] = "meters"
 
         group1 = store.create_group("subgroup")
-        data2 = np.random.rand(50, 50, 50)
-        create_array_compat(
-            group1, "data2", data=data2, chunks=(25, 25, 25)
-        )
-
-        yield str(store_path)
+        create_array_compat(group1, "data2", data=np.ones((50, 50, 50)), chunks=(25, 25, 25))
 
-        shutil.rmtree(temp_dir)
+        return store_path
 
-    def test_diagnose_local_store(self, temp_zarr_store):
+    def test_diagnose_local_store(self, local_zarr_store):
         """Test diagnosing a local Zarr store."""
-        report = diagnose_zarr_store(temp_zarr_store, detailed=True)
+        report = diagnose_zarr_store(local_zarr_store, detailed=True)
 
         assert report["accessible"] is True
         assert report["store_type"] == "Local filesystem"
@@ -136,6 +172,39 @@ class TestDiagnoseZarrStore:
         assert "small_read_time" in report["performance"]
         assert "read_bandwidth_mbps" in report["performance"]
 
+    def test_diagnose_memory_store(self, temp_zarr_store):
+        """Test diagnosing a consolidated store held in fsspec's memory filesystem."""
+        report = diagnose_zarr_store(temp_zarr_store, detailed=True)
+
+        assert report["accessible"] is True
+        assert report["has_consolidated_metadata"] is True
+        assert report["total_arrays"] == 2
+        assert report["arrays"]["data1"]["readable"] is True
+
+        # Raw chunk fetches are timed on top of the decoded read
+        assert "first_byte_latency" in report["performance"]
+        assert report["performance"]["chunk_fetch_bandwidth_mbps"] > 0
+
+    def test_diagnose_cache(self, temp_zarr_store, capsys):
+        """Test reusing cached diagnostic reports."""
+        report = diagnose_zarr_store(temp_zarr_store, cache_ttl=60.0)
+        capsys.readouterr()
+
+        # A cached report is returned without re-running the diagnostics
+        cached = diagnose_zarr_store(temp_zarr_store, cache_ttl=60.0)
+        assert cached == report
+        assert capsys.readouterr().out == ""
+
+        # Mutating the returned report must not leak into the cache
+        cached["issues"].append("mutated")
+        assert "mutated" not in diagnose_zarr_store(temp_zarr_store, cache_ttl=60.0)["issues"]
+
+        invalidate_diagnose_cache(temp_zarr_store)
+        diagnose_zarr_store(temp_zarr_store, cache_ttl=60.0)
+        assert "Operation Summary:" in capsys.readouterr().out
+
+        invalidate_diagnose_cache()
+
     def test_diagnose_with_consolidated(self):
         """Test diagnosing store with consolidated metadata."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -151,17 +220,54 @@ class TestDiagnoseZarrStore:
             assert report["has_consolidated_metadata"] is True
             assert len(report["issues"]) == 0
 
+    def test_diagnose_prefetches_root_metadata(self, monkeypatch):
+        """Test that root metadata is fetched in one batch instead of listing the store."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = str(Path(temp_dir) / "plain.zarr")
+            store = zarr.open_group(store_path, mode="w")
+            create_array_compat(store, "data", data=np.arange(10))
+
+            def fail(*args, **kwargs):
+                raise AssertionError("unexpected request")
+
+            # Only the access check may list the store once the walk is stubbed out
+            monkeypatch.setattr(fsspec.implementations.local.LocalFileSystem, "ls", fail)
+            monkeypatch.setattr(zarr_utils.debug, "open_consolidated_prefetched", fail)
+            monkeypatch.setattr(zarr_utils.inspect, "_walk_group", lambda *args, **kwargs: iter(()))
+
+            # The fetched documents show consolidated metadata is missing
+            report = diagnose_zarr_store(store_path, detailed=False)
+
+            assert report["accessible"] is True
+            assert report["has_consolidated_metadata"] is False
+            assert "Missing consolidated metadata (.zmetadata)" in report["issues"]
+            # The root was not listed, so no file count is reported
+            assert "file_count" not in report
+
+    def test_diagnose_lists_store_without_metadata(self):
+        """Test that a store without root metadata is listed for its file count."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = Path(temp_dir) / "bare.zarr"
+            store_path.mkdir()
+            (store_path / "notes.txt").write_text("not zarr")
+
+            report = diagnose_zarr_store(str(store_path), detailed=False)
+
+            assert report["accessible"] is True
+            assert report["file_count"] == 1
+
     def test_diagnose_single_array(self):
         """Test diagnosing a single array store."""
         with tempfile.TemporaryDirectory() as temp_dir:
             array_path = Path(temp_dir) / "array.zarr"
 
             arr = zarr.open_array(str(array_path), mode="w", shape=(10, 10), chunks=(5, 5))
-            arr[:] = np.random.rand(10, 10)
+            arr[:] = np.ones((10, 10))
 
             report = diagnose_zarr_store(str(array_path))
 
             assert report["accessible"] is True
+            assert report["has_consolidated_metadata"] is False
             assert report.get("is_single_array") is True
             assert "array" in report["arrays"]
 
@@ -239,6 +345,32 @@ class TestExplainZarrError:
         assert "mismatch in array dimensions" in explanation
         assert "inspect_zarr_store" in explanation
 
+    def test_explain_category_priority(self):
+        """Test that messages matching several categories use the highest priority one."""
+        error = OSError("Connection timeout while reading chunk: Access Denied")
+        explanation = explain_zarr_error(error)
+
+        assert "don't have permission" in explanation
+        assert "Network connection issue" not in explanation
+
+        # A .zmetadata message only counts as missing consolidated metadata for KeyError
+        explanation = explain_zarr_error(ValueError("bad .zmetadata for zarr store"))
+        assert "not be a valid Zarr format" in explanation
+
+    def test_explain_reports_innermost_frame(self):
+        """Test that the reported location is the frame that raised."""
+
+        def fail():
+            raise ValueError("boom")
+
+        try:
+            fail()
+        except ValueError as e:
+            explanation = explain_zarr_error(e)
+
+        line = fail.__code__.co_firstlineno + 1
+        assert f"Error occurred in: {__file__}:{line}" in explanation
+
     def test_explain_with_context(self):
         """Test error explanation with context."""
         error = KeyError(".zmetadata")
@@ -1,13 +1,24 @@
-import shutil
+import os
 import tempfile
+import time
+import uuid
 from pathlib import Path
 
+import fsspec
 import numpy as np
 import pytest
 import zarr
 
+import zarr_utils.inspect
 from zarr_utils.compat import create_array_compat
-from zarr_utils.inspect import _sizeof_fmt, _walk_group, inspect_zarr_store, list_zarr_arrays
+from zarr_utils.inspect import (
+    _scan_local,
+    _sizeof_fmt,
+    _walk_group,
+    clear_metadata_cache,
+    inspect_zarr_store,
+    list_zarr_arrays,
+)
 
 
 class TestSizeFormat:
@@ -31,42 +42,56 @@ class TestSizeFormat:
     def test_gigabytes(self):
         assert _sizeof_fmt(1024**3) == " 1.00 GB"
 
+    def test_unit_boundaries(self):
+        # Each power of 1024 starts the next unit exactly
+        for magnitude, unit in enumerate(" KMGTPE"):
+            assert _sizeof_fmt(1024**magnitude) == f" 1.00 {unit}B"
+            if magnitude:
+                assert _sizeof_fmt(1024**magnitude - 1).endswith(f" {' KMGTPE'[magnitude - 1]}B")
+
+        # Sizes beyond exabytes stay in the largest unit
+        assert _sizeof_fmt(1024**7) == "1024.00 EB"
+
     def test_negative_bytes_error(self):
         with pytest.raises(ValueError, match="Negative size not supported"):
             _sizeof_fmt(-100)
 
 
-class TestZarrInspection:
-    """Test Zarr inspection functionality."""
+@pytest.fixture(scope="session")
+def temp_zarr_store():
+    """Create an in-memory Zarr store shared across the test session."""
+    store_url = f"memory://{uuid.uuid4().hex}/test.zarr"
+
+    # Create a Zarr store with nested groups and arrays
+    store = zarr.open_group(store_url, mode="w")
 
-    @pytest.fixture
-    def temp_zarr_store(self):
-        """Create a temporary Zarr store for testing."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "test.zarr"
+    # Only shapes and dtypes are inspected, so the contents can stay uninitialised
+    # Root level array
+    data1 = np.empty((100, 200))
+    create_array_compat(store, "array1", data=data1, chunks=(50, 50))
 
-        # Create a Zarr store with nested groups and arrays
-        store = zarr.open_group(str(store_path), mode="w")
+    # Nested group with arrays
+    group1 = store.create_group("group1")
+    data2 = np.empty((50, 50, 50))
+    create_array_compat(group1, "array2", data=data2, chunks=(25, 25, 25))
+    group1.attrs["test_attr"] = "test_value"
 
-        # Root level array
-        data1 = np.random.rand(100, 200)
-        create_array_compat(store, "array1", data=data1, chunks=(50, 50))
+    # Deeper nesting
+    group2 = group1.create_group("subgroup")
+    data3 = np.empty((10, 10))
+    create_array_compat(group2, "array3", data=data3, chunks=(5, 5))
 
-        # Nested group with arrays
-        group1 = store.create_group("group1")
-        data2 = np.random.rand(50, 50, 50)
-        create_array_compat(group1, "array2", data=data2, chunks=(25, 25, 25))
-        group1.attrs["test_attr"] = "test_value"
+    # Consolidate once so opens in the tests read a single metadata document
+    zarr.consolidate_metadata(store_url)
 
-        # Deeper nesting
-        group2 = group1.create_group("subgroup")
-        data3 = np.random.rand(10, 10)
-        create_array_compat(group2, "array3", data=data3, chunks=(5, 5))
+    yield store_url
 
-        yield str(store_path)
+    # Cleanup
+    fsspec.filesystem("memory").rm(store_url, recursive=True)
 
-        # Cleanup
-        shutil.rmtree(temp_dir)
+
+class TestZarrInspection:
+    """Test Zarr inspection functionality."""
 
     def test_walk_group(self, temp_zarr_store):
         """Test walking through Zarr groups."""
@@ -83,6 +108,10 @@ class TestZarrInspection:
         assert "group1/array2" in paths
         assert "group1/subgroup/array3" in paths
 
+        # Records expose their fields by name as well as by position
+        for record in results:
+            assert record.nbytes == record.dtype.itemsize * int(np.prod(record.shape))
+
         # Check shapes
         for path, shape, _dtype, _nbytes in results:
             if path == "array1":
@@ -92,6 +121,16 @@ class TestZarrInspection:
             elif path == "group1/subgroup/array3":
                 assert shape == (10, 10)
 
+    def test_walk_group_max_workers(self, temp_zarr_store):
+        """Test that the walk finds the same arrays with any number of workers."""
+        store = zarr.open_group(temp_zarr_store, mode="r")
+
+        expected = sorted(_walk_group(store))
+        assert sorted(_walk_group(store, max_workers=1)) == expected
+        assert list_zarr_arrays(temp_zarr_store, max_workers=1) == list_zarr_arrays(
+            temp_zarr_store
+        )
+
     def test_list_zarr_arrays(self, temp_zarr_store):
         """Test listing arrays in a Zarr store."""
         arrays = list_zarr_arrays(temp_zarr_store)
@@ -110,6 +149,17 @@ class TestZarrInspection:
             assert "dtype" in arr
             assert "size_bytes" in arr
 
+    def test_list_zarr_arrays_consolidated_fast_path(self, temp_zarr_store, monkeypatch):
+        """Test that a consolidated store is listed without walking groups."""
+
+        def fail_walk(*args, **kwargs):
+            raise AssertionError("group walk used on a consolidated store")
+
+        monkeypatch.setattr(zarr_utils.inspect, "_walk_group", fail_walk)
+
+        arrays = list_zarr_arrays(temp_zarr_store)
+        assert {a["path"] for a in arrays} == {"array1", "group1/array2", "group1/subgroup/array3"}
+
     def test_inspect_zarr_store(self, temp_zarr_store, capsys):
         """Test inspecting and summarizing a Zarr store."""
         result = inspect_zarr_store(temp_zarr_store, summarize=True)
@@ -146,7 +196,7 @@ class TestZarrInspection:
             arr = zarr.open_array(
                 str(array_path), mode="w", shape=(100, 100), chunks=(50, 50), dtype="f8"
             )
-            arr[:] = np.random.rand(100, 100)
+            arr[:] = np.empty((100, 100))
 
             # List arrays should handle single array
             arrays = list_zarr_arrays(str(array_path))
@@ -170,6 +220,31 @@ class TestZarrInspection:
             assert len(arrays) == 1
             assert arrays[0]["path"] == "data"
 
+    def test_local_scan_matches_walk(self):
+        """Test that the local metadata scan finds the same arrays as zarr."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = str(Path(temp_dir) / "local.zarr")
+
+            store = zarr.open_group(store_path, mode="w")
+            create_array_compat(store, "a", data=np.zeros((20, 30), dtype="f4"))
+            group = store.create_group("g")
+            create_array_compat(group, "b", data=np.zeros(7, dtype="u2"), chunks=(2,))
+            create_array_compat(group.create_group("h"), "c", data=np.zeros((3, 3)))
+
+            scanned = _scan_local(store_path)
+            walked = list(_walk_group(zarr.open_group(store_path, mode="r")))
+            assert sorted(scanned) == sorted(walked)
+
+            # Single array stores are reported under the name "array"
+            array_path = str(Path(temp_dir) / "array.zarr")
+            zarr.open_array(array_path, mode="w", shape=(4, 5), dtype="i8")
+            assert [tuple(r) for r in _scan_local(array_path)] == [
+                ("array", (4, 5), np.dtype("i8"), 160)
+            ]
+
+            # Directories that are not Zarr nodes are left to zarr to report
+            assert _scan_local(temp_dir) is None
+
     def test_empty_store(self):
         """Test with empty Zarr store."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -193,3 +268,77 @@ class TestZarrInspection:
             # Should work with storage options
             arrays = list_zarr_arrays(str(store_path), storage_options={"mode": "r"})
             assert len(arrays) == 1
+
+    def test_cached_listing(self):
+        """Test reusing and clearing cached array listings."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = str(Path(temp_dir) / "cached.zarr")
+
+            store = zarr.open_group(store_path, mode="w")
+            create_array_compat(store, "a", data=np.arange(10))
+            assert len(list_zarr_arrays(store_path, cache_ttl=60.0)) == 1
+
+            # A listing within the TTL is served from the cache
+            create_array_compat(store, "b", data=np.arange(5))
+            assert len(list_zarr_arrays(store_path, cache_ttl=60.0)) == 1
+            assert len(list_zarr_arrays(store_path)) == 2
+
+            clear_metadata_cache(store_path)
+            assert len(list_zarr_arrays(store_path, cache_ttl=60.0)) == 2
+            clear_metadata_cache()
+
+    def test_cached_listing_bounded(self, monkeypatch):
+        """Test that the least recently used and expired listings are dropped."""
+        monkeypatch.setattr(zarr_utils.inspect, "_RECORDS_CACHE_SIZE", 2)
+        clear_metadata_cache()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = {}
+            for name in "abc":
+                paths[name] = str(Path(temp_dir) / f"{name}.zarr")
+                create_array_compat(zarr.open_group(paths[name], mode="w"), "data", data=np.arange(10))
+
+            for name in ("a", "b", "a", "c"):
+                list_zarr_arrays(paths[name], cache_ttl=60.0)
+            cached = [key[0] for key in zarr_utils.inspect._RECORDS_CACHE]
+            assert cached == [paths["a"], paths["c"]]
+
+            # An expired listing is removed when it is next looked up
+            time.sleep(0.02)
+            list_zarr_arrays(paths["a"], cache_ttl=0.01)
+            cached = [key[0] for key in zarr_utils.inspect._RECORDS_CACHE]
+            assert cached == [paths["c"], paths["a"]]
+        clear_metadata_cache()
+
+    @pytest.mark.parametrize("cache", ["block", "simple"])
+    def test_cache_layer(self, cache):
+        """Test reading a store through an fsspec caching layer."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = Path(temp_dir) / "test.zarr"
+
+            store = zarr.open_group(str(store_path), mode="w")
+            create_array_compat(store, "data", data=np.arange(100))
+
+            arrays = list_zarr_arrays(str(store_path), cache=cache)
+            assert [a["path"] for a in arrays] == ["data"]
+            assert arrays[0]["shape"] == (100,)
+
+    @pytest.mark.parametrize("cache, layer", [("block", "blockcache"), ("simple", "simplecache")])
+    def test_cache_layer_stores_reads(self, cache, layer):
+        """Test that reads through a caching layer leave a local copy behind."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = str(Path(temp_dir) / "test.zarr")
+            zarr.open_group(store_path, mode="w")
+
+            mapper = zarr_utils.inspect._get_mapper(store_path, {}, cache=cache)
+            assert type(mapper.fs) is fsspec.get_filesystem_class(layer)
+
+            cache_dir = mapper.fs.storage[-1]
+            before = set(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else set()
+            key = ".zgroup" if ".zgroup" in mapper else "zarr.json"
+            assert mapper[key]
+            assert set(os.listdir(cache_dir)) - before
+
+    def test_unknown_cache_layer(self, temp_zarr_store):
+        """Test that an unknown cache mode is rejected."""
+        with pytest.raises(ValueError, match="Unknown cache mode"):
+            list_zarr_arrays(temp_zarr_store, cache="bogus")
@@ -1,44 +1,114 @@
+import json
+import os
 import shutil
 import tempfile
-from pathlib import Path
 
+import fsspec
 import numpy as np
 import pytest
 import zarr
 
-from zarr_utils.compat import IS_ZARR_V3, access_store_item, create_array_compat
+import zarr_utils.metadata as metadata_module
+from zarr_utils.compat import (
+    IS_ZARR_V3,
+    access_store_item,
+    create_array_compat,
+)
+from zarr_utils.inspect import clear_metadata_cache
 from zarr_utils.metadata import consolidate_metadata, repair_metadata, validate_metadata
 
+# Building a store and encoding its chunks is the expensive part of setup, so
+# each layout is written once per session and copied into every test that
+# uses it. The copies are real files rather than hard links because the tests
+# consolidate and repair their store in place, and in-place writes through a
+# hard link would alter the shared template.
 
-class TestConsolidateMetadata:
-    """Test metadata consolidation functionality."""
 
-    @pytest.fixture
-    def temp_zarr_store(self):
-        """Create a temporary Zarr store without consolidated metadata."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "test.zarr"
+def _copy_store(template, tmp_path):
+    """Copy a template store into a test's temporary directory."""
+    store_path = tmp_path / template.name
+    shutil.copytree(template, store_path)
+    return str(store_path)
+
+
+@pytest.fixture(scope="session")
+def plain_store_template(tmp_path_factory, rng):
+    """Zarr store without consolidated metadata."""
+    store_path = tmp_path_factory.mktemp("templates") / "test.zarr"
+
+    # Create store without consolidation
+    store = zarr.open_group(str(store_path), mode="w")
+    store.attrs["root_attr"] = "root_value"
+
+    # Add arrays
+    data1 = rng.random((10, 10))
+    create_array_compat(store, "array1", data=data1)
+
+    group1 = store.create_group("group1")
+    data2 = rng.random((20, 20))
+    create_array_compat(group1, "array2", data=data2)
+
+    return store_path
+
 
-        # Create store without consolidation
-        store = zarr.open_group(str(store_path), mode="w")
-        store.attrs["root_attr"] = "root_value"
+@pytest.fixture(scope="session")
+def valid_store_template(tmp_path_factory, rng):
+    """Valid Zarr store with consolidated metadata."""
+    store_path = tmp_path_factory.mktemp("templates") / "valid.zarr"
 
-        # Add arrays
-        data1 = np.random.rand(10, 10)
-        create_array_compat(store, "array1", data=data1)
+    store = zarr.open_group(str(store_path), mode="w")
+    store.attrs["description"] = "Test store"
 
-        group1 = store.create_group("group1")
-        data2 = np.random.rand(20, 20)
-        create_array_compat(group1, "array2", data=data2)
+    data_temp = rng.random((10, 10))
+    arr1 = create_array_compat(
+        store, "temperature", data=data_temp, chunks=(5, 5)
+    )
+    arr1.attrs["units"] = "celsius"
 
-        yield str(store_path)
+    group1 = store.create_group("measurements")
+    group1.attrs["location"] = "lab"
 
-        shutil.rmtree(temp_dir)
+    data_pressure = rng.random((20, 20))
+    arr2 = create_array_compat(
+        group1, "pressure", data=data_pressure, chunks=(10, 10)
+    )
+    arr2.attrs["units"] = "pascal"
+
+    # Consolidate metadata
+    zarr.consolidate_metadata(str(store_path))
+
+    return store_path
+
+
+@pytest.fixture(scope="session")
+def invalid_store_template(tmp_path_factory, rng):
+    """Zarr store with missing attributes."""
+    store_path = tmp_path_factory.mktemp("templates") / "invalid.zarr"
+
+    store = zarr.open_group(str(store_path), mode="w")
+    # No root attributes
+
+    # Array without units
+    data = rng.random((10, 10))
+    create_array_compat(store, "data", data=data)
+
+    # Group without attributes
+    store.create_group("empty_group")
+
+    return store_path
+
+
+class TestConsolidateMetadata:
+    """Test metadata consolidation functionality."""
+
+    @pytest.fixture
+    def temp_zarr_store(self, plain_store_template, tmp_path):
+        """Create a temporary Zarr store without consolidated metadata."""
+        return _copy_store(plain_store_template, tmp_path)
 
     def test_consolidate_new_metadata(self, temp_zarr_store, capsys):
         """Test creating new consolidated metadata."""
         # Verify no .zmetadata exists
-        import fsspec
         mapper = fsspec.get_mapper(temp_zarr_store)
         assert access_store_item(mapper, ".zmetadata") is None
 
@@ -52,7 +122,6 @@ class TestConsolidateMetadata:
         assert "Consolidated metadata written" in captured.out
 
         # Verify .zmetadata now exists
-        import fsspec
         mapper = fsspec.get_mapper(temp_zarr_store)
         assert access_store_item(mapper, ".zmetadata") is not None
 
@@ -62,20 +131,35 @@ class TestConsolidateMetadata:
     def test_consolidate_existing_metadata(self, capsys):
         """Test handling of already consolidated metadata."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            store_path = Path(temp_dir) / "consolidated.zarr"
+            store_path = os.path.join(temp_dir, "consolidated.zarr")
 
             # Create and consolidate
-            store = zarr.open_group(str(store_path), mode="w")
+            store = zarr.open_group(store_path, mode="w")
             data = np.arange(100)
             create_array_compat(store, "data", data=data)
-            zarr.consolidate_metadata(str(store_path))
+            zarr.consolidate_metadata(store_path)
 
             # Try to consolidate again
-            consolidate_metadata(str(store_path))
+            consolidate_metadata(store_path)
 
             captured = capsys.readouterr()
             assert "Consolidated metadata exists" in captured.out
 
+    @pytest.mark.skipif(IS_ZARR_V3, reason="Zarr v3 stores keep consolidated metadata in zarr.json")
+    def test_force_rebuild(self, temp_zarr_store, capsys):
+        """Test that force rebuilds existing consolidated metadata."""
+        consolidate_metadata(temp_zarr_store)
+        zarr.open_group(temp_zarr_store, mode="r+")["array1"].attrs["units"] = "m"
+
+        # Without force the existing, now stale, metadata is returned as is
+        stale = consolidate_metadata(temp_zarr_store)
+        assert "units" not in stale["metadata"].get("array1/.zattrs", {})
+        assert "Consolidated metadata exists" in capsys.readouterr().out
+
+        rebuilt = consolidate_metadata(temp_zarr_store, force=True)
+        assert rebuilt["metadata"]["array1/.zattrs"]["units"] == "m"
+        assert "Rebuilding consolidated metadata" in capsys.readouterr().out
+
     def test_dry_run(self, temp_zarr_store, capsys):
         """Test dry run mode."""
         consolidate_metadata(temp_zarr_store, dry_run=True)
@@ -84,10 +168,42 @@ class TestConsolidateMetadata:
         assert "Dry run - metadata not written" in captured.out
 
         # Verify .zmetadata was not created
-        import fsspec
         mapper = fsspec.get_mapper(temp_zarr_store)
         assert access_store_item(mapper, ".zmetadata") is None
 
+    def test_consolidate_not_a_group(self, tmp_path):
+        """Test that a directory without group metadata is rejected."""
+        with pytest.raises(FileNotFoundError, match="No Zarr group found"):
+            consolidate_metadata(str(tmp_path))
+
+    def test_cached_zmetadata(self, tmp_path):
+        """Test that cache_ttl reuses a fetched .zmetadata until it is cleared."""
+        store_path = str(tmp_path / "cached.zarr")
+        zarr.open_group(store_path, mode="w")
+        zmetadata = tmp_path / "cached.zarr" / ".zmetadata"
+        zmetadata.write_text('{"zarr_consolidated_format": 1, "metadata": {"version": 1}}')
+
+        assert consolidate_metadata(store_path, cache_ttl=60)["metadata"] == {"version": 1}
+        zmetadata.write_text('{"zarr_consolidated_format": 1, "metadata": {"version": 2}}')
+        assert consolidate_metadata(store_path, cache_ttl=60)["metadata"] == {"version": 1}
+        assert consolidate_metadata(store_path)["metadata"] == {"version": 2}
+
+        clear_metadata_cache(store_path)
+        assert consolidate_metadata(store_path, cache_ttl=60)["metadata"] == {"version": 2}
+        clear_metadata_cache()
+
+    def test_zmetadata_cache_evicts_least_recently_used(self, monkeypatch):
+        """Test that the document read longest ago, not the oldest entry, is dropped."""
+        monkeypatch.setattr(metadata_module, "_ZMETADATA_CACHE_SIZE", 2)
+        clear_metadata_cache()
+        stores = {name: {".zmetadata": name.encode()} for name in "abc"}
+
+        for name in ("a", "b", "a", "c"):
+            metadata_module._read_zmetadata(stores[name], (name,), cache_ttl=60)
+
+        assert list(metadata_module._ZMETADATA_CACHE) == [("a",), ("c",)]
+        clear_metadata_cache()
+
     def test_storage_options(self, temp_zarr_store):
         """Test with custom storage options."""
         metadata = consolidate_metadata(temp_zarr_store, storage_options={"mode": "r+"})
@@ -99,55 +215,14 @@ class TestValidateMetadata:
     """Test metadata validation functionality."""
 
     @pytest.fixture
-    def valid_zarr_store(self):
+    def valid_zarr_store(self, valid_store_template, tmp_path):
         """Create a valid Zarr store with consolidated metadata."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "valid.zarr"
-
-        store = zarr.open_group(str(store_path), mode="w")
-        store.attrs["description"] = "Test store"
-
-        data_temp = np.random.rand(10, 10)
-        arr1 = create_array_compat(
-            store, "temperature", data=data_temp, chunks=(5, 5)
-        )
-        arr1.attrs["units"] = "celsius"
-
-        group1 = store.create_group("measurements")
-        group1.attrs["location"] = "lab"
-
-        data_pressure = np.random.rand(20, 20)
-        arr2 = create_array_compat(
-            group1, "pressure", data=data_pressure, chunks=(10, 10)
-        )
-        arr2.attrs["units"] = "pascal"
-
-        # Consolidate metadata
-        zarr.consolidate_metadata(str(store_path))
-
-        yield str(store_path)
-
-        shutil.rmtree(temp_dir)
+        return _copy_store(valid_store_template, tmp_path)
 
     @pytest.fixture
-    def invalid_zarr_store(self):
+    def invalid_zarr_store(self, invalid_store_template, tmp_path):
         """Create a Zarr store with issues."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "invalid.zarr"
-
-        store = zarr.open_group(str(store_path), mode="w")
-        # No root attributes
-
-        # Array without units
-        data = np.random.rand(10, 10)
-        create_array_compat(store, "data", data=data)
-
-        # Group without attributes
-        store.create_group("empty_group")
-
-        yield str(store_path)
-
-        shutil.rmtree(temp_dir)
+        return _copy_store(invalid_store_template, tmp_path)
 
     def test_validate_valid_store(self, valid_zarr_store, capsys):
         """Test validation of a valid store."""
@@ -163,6 +238,83 @@ class TestValidateMetadata:
         assert "Valid: ✓" in captured.out
         assert "Consolidated metadata: ✓" in captured.out
 
+    @pytest.mark.skipif(IS_ZARR_V3, reason="Zarr v3 stores keep consolidated metadata in zarr.json")
+    def test_validate_from_consolidated(self, valid_zarr_store, monkeypatch):
+        """Test that consolidated stores are validated without opening the hierarchy."""
+        zmetadata = os.path.join(valid_zarr_store, ".zmetadata")
+        with open(zmetadata, "rb") as f:
+            saved = f.read()
+
+        # Validate by walking the hierarchy with .zmetadata temporarily removed
+        os.remove(zmetadata)
+        walked = validate_metadata(valid_zarr_store)
+        with open(zmetadata, "wb") as f:
+            f.write(saved)
+
+        def fail_open(*args, **kwargs):
+            raise AssertionError("store opened although .zmetadata describes it")
+
+        monkeypatch.setattr(zarr, "open_consolidated", fail_open)
+        monkeypatch.setattr(zarr, "open_group", fail_open)
+
+        report = validate_metadata(valid_zarr_store)
+        assert report["valid"] is True
+        assert report["arrays"] == walked["arrays"]
+        assert report["groups"] == walked["groups"]
+
+    @pytest.mark.skipif(IS_ZARR_V3, reason="Zarr v3 stores keep consolidated metadata in zarr.json")
+    def test_validate_streamed_consolidated(self, valid_zarr_store, monkeypatch):
+        """Test that large .zmetadata streamed with ijson gives the same report."""
+        pytest.importorskip("ijson")
+        parsed = metadata_module._validate_metadata_with_meta(valid_zarr_store)
+
+        monkeypatch.setattr(metadata_module, "_STREAM_THRESHOLD", 0)
+        streamed = metadata_module._validate_metadata_with_meta(valid_zarr_store)
+
+        assert streamed[0] == parsed[0]
+        assert parsed[1] is not None
+        assert streamed[1] is None
+
+    @pytest.mark.skipif(IS_ZARR_V3, reason="Zarr v3 stores keep consolidated metadata in zarr.json")
+    def test_validate_streamed_falls_back_to_json(self, valid_zarr_store, monkeypatch):
+        """Test that documents ijson cannot stream are parsed as a whole instead."""
+        pytest.importorskip("ijson")
+        monkeypatch.setattr(metadata_module, "_STREAM_THRESHOLD", 0)
+        zmetadata = os.path.join(valid_zarr_store, ".zmetadata")
+        with open(zmetadata) as f:
+            document = json.load(f)
+
+        # Bare NaN attribute values are rejected by ijson but not by json_loads
+        document["metadata"]["temperature/.zattrs"]["offset"] = float("nan")
+        with open(zmetadata, "w") as f:
+            json.dump(document, f)
+        assert metadata_module._stream_consolidated(json.dumps(document).encode()) is None
+
+        report = validate_metadata(valid_zarr_store)
+        assert report["valid"] is True
+        assert "temperature" in report["arrays"]
+
+        # A document without a metadata mapping is not read as an empty store
+        assert metadata_module._stream_consolidated(b'{"zarr_consolidated_format": 1}') is None
+
+    @pytest.mark.skipif(not IS_ZARR_V3, reason="Inline consolidated metadata needs Zarr v3")
+    def test_validate_from_inline_consolidated(self, valid_zarr_store, monkeypatch):
+        """Test that v3 stores are validated from the metadata inlined in zarr.json."""
+        with monkeypatch.context() as m:
+            m.setattr(metadata_module, "_read_inline_consolidated", lambda mapper: None)
+            walked = validate_metadata(valid_zarr_store)
+
+        def fail_open(*args, **kwargs):
+            raise AssertionError("store opened although zarr.json describes it")
+
+        monkeypatch.setattr(zarr, "open_consolidated", fail_open)
+        monkeypatch.setattr(zarr, "open_group", fail_open)
+
+        report = validate_metadata(valid_zarr_store)
+        assert report["has_consolidated"] is True
+        assert report["groups"] == walked["groups"]
+        assert report["arrays"] == walked["arrays"]
+
     def test_validate_invalid_store(self, invalid_zarr_store, capsys):
         """Test validation of store with issues."""
         report = validate_metadata(invalid_zarr_store)
@@ -181,25 +333,41 @@ class TestValidateMetadata:
         assert "Valid: ✗" in captured.out
         assert "Issues found" in captured.out
 
+    def test_validate_batched_without_consolidated(self, invalid_zarr_store, monkeypatch):
+        """Test that stores without .zmetadata are validated from one batched read."""
+        with monkeypatch.context() as m:
+            m.setattr(metadata_module, "_gather_metadata", lambda mapper: None)
+            m.setattr(metadata_module, "_gather_v3_metadata", lambda mapper: None)
+            walked = validate_metadata(invalid_zarr_store)
+
+        def fail_open(*args, **kwargs):
+            raise AssertionError("store opened although its metadata was batch-read")
+
+        monkeypatch.setattr(zarr, "open_group", fail_open)
+
+        report = validate_metadata(invalid_zarr_store)
+        assert report["arrays"] == walked["arrays"]
+        assert report["groups"] == walked["groups"]
+        assert report["issues"] == walked["issues"]
+
     def test_validate_corrupted_metadata(self):
         """Test handling of corrupted .zmetadata."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            store_path = Path(temp_dir) / "corrupted.zarr"
+            store_path = os.path.join(temp_dir, "corrupted.zarr")
 
-            store = zarr.open_group(str(store_path), mode="w")
+            store = zarr.open_group(store_path, mode="w")
             data = np.arange(100)
             create_array_compat(store, "data", data=data)
 
             # Manually create invalid .zmetadata
             if IS_ZARR_V3:
                 # For v3, write directly to filesystem
-                import os
-                with open(os.path.join(str(store_path), ".zmetadata"), "wb") as f:
+                with open(os.path.join(store_path, ".zmetadata"), "wb") as f:
                     f.write(b'{"invalid json')
             else:
                 store.store[".zmetadata"] = b'{"invalid json'
 
-            report = validate_metadata(str(store_path))
+            report = validate_metadata(store_path)
 
             assert report["valid"] is False
             assert any("Invalid JSON" in issue for issue in report["issues"])
@@ -208,61 +376,113 @@ class TestValidateMetadata:
 class TestRepairMetadata:
     """Test metadata repair functionality."""
 
-    def test_repair_missing_consolidated(self, capsys):
+    def test_repair_missing_consolidated(self, capsys, rng):
         """Test repairing missing consolidated metadata."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            store_path = Path(temp_dir) / "repair.zarr"
+            store_path = os.path.join(temp_dir, "repair.zarr")
 
-            store = zarr.open_group(str(store_path), mode="w")
-            data = np.random.rand(10, 10)
+            store = zarr.open_group(store_path, mode="w")
+            data = rng.random((10, 10))
             create_array_compat(store, "data", data=data)
 
             # Repair
-            repair_metadata(str(store_path))
+            repair_metadata(store_path)
 
             # Verify consolidated metadata was created
-            import fsspec
-            mapper = fsspec.get_mapper(str(store_path))
+            mapper = fsspec.get_mapper(store_path)
             assert access_store_item(mapper, ".zmetadata") is not None
 
             captured = capsys.readouterr()
             assert "Creating consolidated metadata" in captured.out
             assert "Repair complete" in captured.out
 
-    def test_repair_valid_store(self, capsys):
+    def test_repair_valid_store(self, capsys, rng):
         """Test repair on already valid store."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            store_path = Path(temp_dir) / "valid.zarr"
+            store_path = os.path.join(temp_dir, "valid.zarr")
 
-            store = zarr.open_group(str(store_path), mode="w")
+            store = zarr.open_group(store_path, mode="w")
             store.attrs["description"] = "Test store"  # Add root attributes
-            data = np.random.rand(10, 10)
+            data = rng.random((10, 10))
             arr = create_array_compat(store, "data", data=data)
             arr.attrs["units"] = "meters"
-            zarr.consolidate_metadata(str(store_path))
+            zarr.consolidate_metadata(store_path)
 
-            repair_metadata(str(store_path))
+            repair_metadata(store_path)
 
             captured = capsys.readouterr()
             assert "No repairs needed" in captured.out
 
-    def test_repair_add_missing_attrs(self):
+    def test_repair_add_missing_attrs(self, rng):
         """Test adding missing attributes."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            store_path = Path(temp_dir) / "missing_attrs.zarr"
+            store_path = os.path.join(temp_dir, "missing_attrs.zarr")
 
-            store = zarr.open_group(str(store_path), mode="w")
+            store = zarr.open_group(store_path, mode="w")
             # Create array without units
-            data = np.random.rand(10, 10)
+            data = rng.random((10, 10))
             create_array_compat(store, "data", data=data)
 
-            repair_metadata(str(store_path), add_missing_attrs=True)
+            repair_metadata(store_path, add_missing_attrs=True)
 
             # Verify units were added
-            store = zarr.open_group(str(store_path), mode="r")
+            store = zarr.open_group(store_path, mode="r")
             assert "units" in store["data"].attrs
             assert store["data"].attrs["units"] == "unknown"
 
+    def test_repair_attrs_reach_consolidated_metadata(self):
+        """Test that added attributes are visible through consolidated metadata."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = os.path.join(temp_dir, "stale.zarr")
+
+            store = zarr.open_group(store_path, mode="w")
+            store.attrs["description"] = "Test store"
+            create_array_compat(store, "a", data=np.zeros(4))
+            create_array_compat(store.create_group("g"), "b", data=np.zeros(4))
+            zarr.consolidate_metadata(store_path)
+
+            repair_metadata(store_path, add_missing_attrs=True)
+
+            root = zarr.open_consolidated(store_path, mode="r")
+            assert root["a"].attrs["units"] == "unknown"
+            assert root["g/b"].attrs["units"] == "unknown"
+
+    def test_repair_keeps_attrs_added_after_consolidation(self):
+        """Test that attributes missing from .zmetadata survive repair."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = os.path.join(temp_dir, "newer_attrs.zarr")
+
+            store = zarr.open_group(store_path, mode="w")
+            create_array_compat(store, "a", data=np.zeros(4))
+            zarr.consolidate_metadata(store_path)
+            zarr.open_array(os.path.join(store_path, "a"), mode="r+").attrs["long_name"] = "Depth"
+
+            repair_metadata(store_path, add_missing_attrs=True)
+
+            attrs = zarr.open_array(os.path.join(store_path, "a"), mode="r").attrs
+            assert attrs["units"] == "unknown"
+            assert attrs["long_name"] == "Depth"
+
+    @pytest.mark.skipif(IS_ZARR_V3, reason="Zarr v3 format stores are consolidated by zarr")
+    def test_repair_reuses_validated_documents(self, monkeypatch):
+        """Test that repair consolidates the documents validation already read."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store_path = os.path.join(temp_dir, "unconsolidated.zarr")
+
+            store = zarr.open_group(store_path, mode="w")
+            store.attrs["description"] = "Test store"
+            create_array_compat(store.create_group("g"), "b", data=np.zeros(4))
+
+            def fail_rescan(*args, **kwargs):
+                raise AssertionError("store metadata read again for consolidation")
+
+            monkeypatch.setattr(metadata_module, "consolidate_metadata_fast", fail_rescan)
+            repair_metadata(store_path, add_missing_attrs=True)
+
+            root = zarr.open_consolidated(store_path, mode="r")
+            assert root["g/b"].attrs["units"] == "unknown"
+            assert root.attrs["description"] == "Test store"
+
     def test_repair_readonly_store(self, capsys):
         """Test repair on read-only store."""
         # This should show the message about read-only stores even before trying to access
@@ -1,13 +1,13 @@
-import shutil
+import os
 import tempfile
-from pathlib import Path
 
 import numpy as np
 import pytest
 import zarr
 
+import zarr_utils.xarray as xarray_module
 from zarr_utils.compat import create_array_compat
-from zarr_utils.xarray import get_voxel_spacing, open_xarray
+from zarr_utils.xarray import _make_coords, get_voxel_spacing, open_xarray
 
 
 class TestVoxelSpacing:
@@ -72,19 +72,58 @@ class TestVoxelSpacing:
         spacing = get_voxel_spacing(MockZarr())
         assert spacing == (1.0, 1.0, 1.0)  # Should fall back to default
 
+    def test_spacing_attribute_priority(self):
+        """Test that unusable attributes fall through to the next format."""
+
+        class MockZarr:
+            attrs = {
+                "pixelResolution": {"unit": "nm"},
+                "spacing": [1.0, 2.0],
+                "voxelSize": [4.0, 5.0, 6.0],
+                "z_spacing": 7.0,
+            }
+
+        assert get_voxel_spacing(MockZarr()) == (4.0, 5.0, 6.0)
+
+        # An incomplete set of axis attributes gives the default
+        class PartialAxes:
+            attrs = {"z_spacing": 5.0, "y_spacing": 2.0}
+
+        assert get_voxel_spacing(PartialAxes()) == (1.0, 1.0, 1.0)
+
+    def test_spacing_reads_attributes_once(self):
+        """Test that attributes are read in one pass rather than probed per key."""
+
+        class SnapshotOnly:
+            def __init__(self, values):
+                self._values = values
+
+            def keys(self):
+                return self._values.keys()
+
+            def __getitem__(self, key):
+                return self._values[key]
+
+            def __contains__(self, key):
+                raise AssertionError(f"attributes probed for {key!r}")
+
+        class Obj:
+            attrs = SnapshotOnly({"z_spacing": 3.0, "y_spacing": 2.0, "x_spacing": 2.0})
+
+        assert get_voxel_spacing(Obj()) == (3.0, 2.0, 2.0)
+
 
 class TestOpenXarray:
     """Test opening Zarr arrays as xarray Datasets."""
 
     @pytest.fixture
-    def temp_zarr_3d(self):
+    def temp_zarr_3d(self, store_dir):
         """Create a temporary 3D Zarr array."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "test3d.zarr"
+        store_path = os.path.join(store_dir, "test3d.zarr")
 
         # Create 3D array with attributes
         arr = zarr.open_array(
-            str(store_path), mode="w", shape=(10, 20, 30), chunks=(5, 10, 15), dtype="f4"
+            store_path, mode="w", shape=(10, 20, 30), chunks=(5, 10, 15), dtype="f4"
         )
         arr[:] = np.random.rand(10, 20, 30)
         arr.attrs["pixelResolution"] = {
@@ -92,17 +131,14 @@ class TestOpenXarray:
         }
         arr.attrs["test_attr"] = "test_value"
 
-        yield str(store_path)
-
-        shutil.rmtree(temp_dir)
+        return store_path
 
     @pytest.fixture
-    def temp_zarr_group(self):
+    def temp_zarr_group(self, store_dir):
         """Create a temporary Zarr group with arrays."""
-        temp_dir = tempfile.mkdtemp()
-        store_path = Path(temp_dir) / "test_group.zarr"
+        store_path = os.path.join(store_dir, "test_group.zarr")
 
-        store = zarr.open_group(str(store_path), mode="w")
+        store = zarr.open_group(store_path, mode="w")
 
         # Create group with data array
         group = store.create_group("mygroup")
@@ -110,9 +146,7 @@ class TestOpenXarray:
         arr = create_array_compat(group, "data", data=data, chunks=(5, 5, 5))
         arr.attrs["spacing"] = [2.0, 1.0, 1.0]
 
-        yield str(store_path)
-
-        shutil.rmtree(temp_dir)
+        return store_path
 
     def test_open_3d_array_with_coords(self, temp_zarr_3d):
         """Test opening 3D array with coordinates."""
@@ -155,13 +189,13 @@ class TestOpenXarray:
     def test_open_2d_array(self):
         """Test opening 2D array (should add z dimension)."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            array_path = Path(temp_dir) / "test2d.zarr"
+            array_path = os.path.join(temp_dir, "test2d.zarr")
 
             # Create 2D array
-            arr = zarr.open_array(str(array_path), mode="w", shape=(100, 200), chunks=(50, 100))
+            arr = zarr.open_array(array_path, mode="w", shape=(100, 200), chunks=(50, 100))
             arr[:] = np.random.rand(100, 200)
 
-            ds = open_xarray(str(array_path), "")
+            ds = open_xarray(array_path, "")
 
             # Should have z dimension added
             assert ds["values"].shape == (1, 100, 200)
@@ -170,15 +204,15 @@ class TestOpenXarray:
     def test_open_4d_array(self):
         """Test opening 4D array."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            array_path = Path(temp_dir) / "test4d.zarr"
+            array_path = os.path.join(temp_dir, "test4d.zarr")
 
             # Create 4D array
             arr = zarr.open_array(
-                str(array_path), mode="w", shape=(3, 10, 20, 30), chunks=(1, 5, 10, 15)
+                array_path, mode="w", shape=(3, 10, 20, 30), chunks=(1, 5, 10, 15)
             )
             arr[:] = np.random.rand(3, 10, 20, 30)
 
-            ds = open_xarray(str(array_path), "")
+            ds = open_xarray(array_path, "")
 
             assert ds["values"].shape == (3, 10, 20, 30)
             assert list(ds["values"].dims) == ["c", "z", "y", "x"]
@@ -186,6 +220,42 @@ class TestOpenXarray:
             # Channel dimension should have integer coords
             assert ds.coords["c"].dtype == np.int64
 
+    def test_coords_shared_between_datasets(self, temp_zarr_3d):
+        """Test that datasets on the same grid reuse read-only coordinates."""
+        ds1 = open_xarray(temp_zarr_3d, "")
+        ds2 = open_xarray(temp_zarr_3d, "", var_name="other")
+
+        np.testing.assert_array_equal(ds1.coords["x"].values, ds2.coords["x"].values)
+        np.testing.assert_almost_equal(ds1.coords["x"].values[-1], 29 * 50e-9)
+        assert ds1.coords["z"].values.size == 10
+        assert not _make_coords(("z", "y", "x"), (10, 20, 30), (100.0, 50.0, 50.0))[
+            "x"
+        ].flags.writeable
+
+    def test_coord_dtype(self, temp_zarr_3d):
+        """Test that physical coordinates can be built as float32."""
+        ds = open_xarray(temp_zarr_3d, "", coord_dtype=np.float32)
+
+        assert ds.coords["x"].dtype == np.float32
+        np.testing.assert_allclose(ds.coords["x"].values[-1], 29 * 50e-9, rtol=1e-6)
+
+        with pytest.raises(ValueError, match="floating point"):
+            open_xarray(temp_zarr_3d, "", coord_dtype=np.int64)
+
+    def test_lazy_coords_for_long_axes(self, temp_zarr_3d, monkeypatch):
+        """Test that long axes get RangeIndex coordinates matching the eager ones."""
+        range_index = pytest.importorskip("xarray.indexes").RangeIndex
+        eager = open_xarray(temp_zarr_3d, "")
+
+        monkeypatch.setattr(xarray_module, "_LAZY_COORD_SIZE", 15)
+        ds = open_xarray(temp_zarr_3d, "")
+
+        assert isinstance(ds.xindexes["x"], range_index)
+        assert isinstance(ds.xindexes["y"], range_index)
+        assert not isinstance(ds.xindexes["z"], range_index)
+        for dim in "zyx":
+            np.testing.assert_allclose(ds.coords[dim].values, eager.coords[dim].values)
+
     def test_custom_storage_options(self, temp_zarr_3d):
         """Test with custom storage options."""
         ds = open_xarray(temp_zarr_3d, "", storage_options={"mode": "r"})
@@ -225,9 +295,9 @@ class TestOpenXarray:
     def test_group_with_multiple_arrays(self):
         """Test opening group with multiple arrays (should pick first)."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            store_path = Path(temp_dir) / "multi.zarr"
+            store_path = os.path.join(temp_dir, "multi.zarr")
 
-            store = zarr.open_group(str(store_path), mode="w")
+            store = zarr.open_group(store_path, mode="w")
             data1 = np.ones((5, 5, 5))
             create_array_compat(store, "data", data=data1)
 
@@ -235,6 +305,6 @@ class TestOpenXarray:
             create_array_compat(store, "other", data=data2)
 
             # Should pick 'data' array
-            ds = open_xarray(str(store_path), "")
+            ds = open_xarray(store_path, "")
             assert ds["values"].shape == (5, 5, 5)
             np.testing.assert_array_equal(ds["values"].values, 1.0)
@@ -1,14 +1,21 @@
-from .debug import ZarrDebugger, diagnose_zarr_store, enable_debug_mode, explain_zarr_error
-from .inspect import inspect_zarr_store, list_zarr_arrays
+from .debug import (
+    ZarrDebugger,
+    diagnose_zarr_store,
+    enable_debug_mode,
+    explain_zarr_error,
+    invalidate_diagnose_cache,
+)
+from .inspect import clear_metadata_cache, inspect_zarr_store, list_zarr_arrays
 from .metadata import consolidate_metadata, repair_metadata, validate_metadata
 from .xarray import get_voxel_spacing, open_xarray
 
 # Import VTK functions only if VTK is available
 try:
-    from .visualization import HAS_VTK, to_vti, to_vtk, wrap_vtk
+    from .visualization import HAS_VTK, to_vti, to_vtk, wrap_vtk, wrap_vtk_batch
 except ImportError:
     HAS_VTK = False
     wrap_vtk = None
+    wrap_vtk_batch = None
     to_vtk = None
     to_vti = None
 
@@ -21,12 +28,14 @@ __all__ = [
     "get_voxel_spacing",
     "inspect_zarr_store",
     "list_zarr_arrays",
+    "clear_metadata_cache",
     # Metadata tools
     "consolidate_metadata",
     "validate_metadata",
     "repair_metadata",
     # Debug tools
     "diagnose_zarr_store",
+    "invalidate_diagnose_cache",
     "explain_zarr_error",
     "enable_debug_mode",
     "ZarrDebugger",
@@ -34,4 +43,4 @@ __all__ = [
 
 # Only export VTK functions if available
 if HAS_VTK:
-    __all__.extend(["wrap_vtk", "to_vtk", "to_vti", "HAS_VTK"])
+    __all__.extend(["wrap_vtk", "wrap_vtk_batch", "to_vtk", "to_vti", "HAS_VTK"])
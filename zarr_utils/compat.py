@@ -1,154 +1,512 @@
 """Compatibility layer for Zarr v2 and v3."""
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+import fsspec
+import numpy as np
 import zarr
+from fsspec.implementations.local import LocalFileSystem
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Detect Zarr version
 ZARR_VERSION = tuple(int(x) for x in zarr.__version__.split('.')[:2])
 IS_ZARR_V3 = ZARR_VERSION[0] >= 3
 
 
+def json_loads(data):
+    """Parse a JSON metadata document, using orjson when it is installed.
+
+    orjson rejects the bare ``NaN``/``Infinity`` tokens that the standard
+    library writes for non-finite attribute values, so such documents are
+    parsed again with ``json``.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+# URL schemes served by fsspec, for which storage_options are forwarded
+_REMOTE_SCHEMES = ('s3://', 'gs://', 'az://', 'http://', 'https://')
+
+
 def get_store_from_mapper(mapper):
     """Get the underlying store from a mapper."""
-    if IS_ZARR_V3:
-        # In v3, mapper is the store itself
-        return mapper
-    else:
-        # In v2, we might need to access the store differently
-        return mapper
+    # Both v2 and v3 accept an fsspec mapper wherever a store is expected
+    return mapper
 
 
-def consolidate_metadata(store_or_mapper, metadata_key: str = '.zmetadata'):
+def _consolidate_metadata_v3(store_or_mapper, metadata_key: str = '.zmetadata'):
     """Consolidate metadata in a version-compatible way."""
-    if IS_ZARR_V3:
-        # v3 doesn't accept metadata_key parameter
-        return zarr.consolidate_metadata(store_or_mapper)
-    else:
-        # v2 accepts metadata_key
-        return zarr.consolidate_metadata(store_or_mapper, metadata_key=metadata_key)
+    # v3 doesn't accept metadata_key parameter
+    return zarr.consolidate_metadata(store_or_mapper)
+
+
+def _consolidate_metadata_v2(store_or_mapper, metadata_key: str = '.zmetadata'):
+    """Consolidate metadata in a version-compatible way."""
+    # v2 accepts metadata_key
+    return zarr.consolidate_metadata(store_or_mapper, metadata_key=metadata_key)
+
+
+_V2_METADATA_FILES = frozenset({'.zarray', '.zattrs', '.zgroup'})
+
+
+def _local_metadata_files(root: str) -> Optional[list]:
+    """Find the v2 metadata files below a local store with os.scandir.
+
+    Directory entries carry their file type, so no per-entry stat is needed,
+    and array directories are not descended into since they only hold
+    chunks. Returns None if a zarr.json is found, i.e. for v3 format stores.
+    """
+    files = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        is_array = False
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name == 'zarr.json':
+                    return None
+                elif entry.name in _V2_METADATA_FILES:
+                    files.append(entry.path)
+                    is_array = is_array or entry.name == '.zarray'
+        if not is_array:
+            stack.extend(subdirs)
+    return files
+
+
+def _find_metadata_keys(fs, path: str) -> Optional[list]:
+    """List the v2 metadata keys below ``path`` on ``fs``.
+
+    Local stores are walked with os.scandir, other filesystems are listed
+    with a single ``find``. Returns None for v3 format stores.
+    """
+    if isinstance(fs, LocalFileSystem):
+        files = _local_metadata_files(path)
+        if files is None:
+            return None
+        return [file.replace(os.sep, '/') for file in files]
+
+    keys = []
+    for key in fs.find(path):
+        name = key.rsplit('/', 1)[-1]
+        if name == 'zarr.json':
+            return None
+        if name in _V2_METADATA_FILES:
+            keys.append(key)
+    return keys
+
+
+def _local_v3_metadata_files(root: str) -> list:
+    """Find the zarr.json files below a local v3 format store with os.scandir.
+
+    The zarr.json of each directory is parsed to tell arrays from groups,
+    and array directories are not descended into since they only hold
+    chunks.
+    """
+    files = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            entries = list(it)
+        subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+        document = os.path.join(directory, 'zarr.json')
+        if any(entry.name == 'zarr.json' for entry in entries):
+            files.append(document)
+            with open(document, 'rb') as f:
+                if json_loads(f.read()).get('node_type') == 'array':
+                    continue
+        stack.extend(subdirs)
+    return files
+
+
+def _find_v3_metadata_keys(fs, path: str) -> list:
+    """List the zarr.json keys below ``path`` on ``fs``.
+
+    Local stores are walked with os.scandir, other filesystems are listed
+    with a single ``find``.
+    """
+    if isinstance(fs, LocalFileSystem):
+        return [file.replace(os.sep, '/') for file in _local_v3_metadata_files(path)]
+    return [key for key in fs.find(path) if key.rsplit('/', 1)[-1] == 'zarr.json']
+
+
+def batch_get_metadata(fs, keys: list) -> dict:
+    """Fetch and parse many JSON metadata documents in one batch.
+
+    All keys go to a single ``fs.cat`` call, which async filesystems (S3,
+    GCS, HTTP) serve with concurrent requests instead of one round-trip per
+    key. Keys that do not exist are left out of the result.
+
+    Parameters
+    ----------
+    fs : fsspec.AbstractFileSystem
+        Filesystem holding the documents
+    keys : list of str
+        Full paths of the documents on ``fs``
+
+    Returns
+    -------
+    dict
+        Parsed documents keyed by path
+    """
+    if not keys:
+        return {}
+    blobs = fs.cat(list(keys), on_error='omit')
+    return {key: json_loads(blob) for key, blob in blobs.items()}
+
+
+def consolidate_metadata_fast(store_path: str, storage_options: Optional[dict] = None) -> Optional[dict]:
+    """Write .zmetadata by listing the store once and fetching all metadata files in one batch.
+
+    zarr.consolidate_metadata reads each metadata key in turn, which costs a
+    round-trip per key on remote stores. Here the keys are discovered with a
+    single listing and read with batch_get_metadata. Local stores are walked
+    with os.scandir.
+
+    Only Zarr v2 format stores are handled, since v3 stores keep their
+    consolidated metadata inside the root zarr.json. For those None is
+    returned and nothing is written.
+    """
+    fs, path = fsspec.core.url_to_fs(store_path, **(storage_options or {}))
+    path = path.rstrip('/')
+
+    keys = _find_metadata_keys(fs, path)
+    if keys is None:
+        return None
+    prefix = len(path) + 1
+    metadata = {key[prefix:]: doc for key, doc in batch_get_metadata(fs, keys).items()}
+
+    return write_consolidated_metadata(fs, path, metadata)
+
+
+def write_consolidated_metadata(fs, path: str, metadata: dict) -> dict:
+    """Write a .zmetadata document holding already-read v2 metadata documents.
+
+    Parameters
+    ----------
+    fs : fsspec.AbstractFileSystem
+        Filesystem holding the store
+    path : str
+        Path of the store root on ``fs``
+    metadata : dict
+        Parsed .zarray, .zattrs and .zgroup documents keyed by their path
+        relative to the store root
+
+    Returns
+    -------
+    dict
+        The consolidated metadata that was written
+    """
+    consolidated = {'zarr_consolidated_format': 1, 'metadata': metadata}
+    fs.pipe_file(f'{path}/.zmetadata', json.dumps(consolidated, indent=4, sort_keys=True).encode())
+    return consolidated
 
 
 def open_array_with_storage_options(store_path: str, mode: str = 'r', storage_options: Optional[dict] = None, **kwargs):
     """Open array with storage options in a version-compatible way."""
-    if IS_ZARR_V3:
-        # v3 only accepts storage_options for fsspec stores
-        if store_path.startswith(('s3://', 'gs://', 'az://', 'http://', 'https://')):
-            return zarr.open_array(store_path, mode=mode, storage_options=storage_options, **kwargs)
-        else:
-            # For local paths, don't pass storage_options
-            return zarr.open_array(store_path, mode=mode, **kwargs)
-    else:
-        # v2 also only accepts storage_options for fsspec stores
-        if store_path.startswith(('s3://', 'gs://', 'az://', 'http://', 'https://')):
-            return zarr.open_array(store_path, mode=mode, storage_options=storage_options, **kwargs)
-        else:
-            # For local paths, don't pass storage_options
-            return zarr.open_array(store_path, mode=mode, **kwargs)
+    # Both v2 and v3 only accept storage_options for fsspec stores
+    if store_path.startswith(_REMOTE_SCHEMES):
+        return zarr.open_array(store_path, mode=mode, storage_options=storage_options, **kwargs)
+    # For local paths, don't pass storage_options
+    return zarr.open_array(store_path, mode=mode, **kwargs)
 
 
 def open_group_with_storage_options(store_path: str, mode: str = 'r', storage_options: Optional[dict] = None, **kwargs):
     """Open group with storage options in a version-compatible way."""
-    if IS_ZARR_V3:
-        # v3 only accepts storage_options for fsspec stores
-        if store_path.startswith(('s3://', 'gs://', 'az://', 'http://', 'https://')):
-            return zarr.open_group(store_path, mode=mode, storage_options=storage_options, **kwargs)
-        else:
-            # For local paths, don't pass storage_options
-            return zarr.open_group(store_path, mode=mode, **kwargs)
-    else:
-        # v2 also only accepts storage_options for fsspec stores
-        if store_path.startswith(('s3://', 'gs://', 'az://', 'http://', 'https://')):
-            return zarr.open_group(store_path, mode=mode, storage_options=storage_options, **kwargs)
-        else:
-            # For local paths, don't pass storage_options
-            return zarr.open_group(store_path, mode=mode, **kwargs)
+    # Both v2 and v3 only accept storage_options for fsspec stores
+    if store_path.startswith(_REMOTE_SCHEMES):
+        return zarr.open_group(store_path, mode=mode, storage_options=storage_options, **kwargs)
+    # For local paths, don't pass storage_options
+    return zarr.open_group(store_path, mode=mode, **kwargs)
+
+
+def _open_consolidated_prefetched_v3(mapper, zmetadata: Optional[bytes] = None):
+    """Open a group from consolidated metadata (v3 reads it from zarr.json)."""
+    return zarr.open_consolidated(mapper, mode='r')
+
+
+def _open_consolidated_prefetched_v2(mapper, zmetadata: Optional[bytes] = None):
+    """Open a group from consolidated metadata, reusing already fetched .zmetadata bytes.
+
+    The metadata is served from an in-memory store holding the bytes while
+    chunks are still read through ``mapper``, so .zmetadata is not fetched
+    a second time.
+    """
+    if zmetadata is None:
+        return zarr.open_consolidated(mapper, mode='r')
+    return zarr.open_consolidated({'.zmetadata': zmetadata}, mode='r', chunk_store=mapper)
+
+
+def _get_array_compressor_v3(array):
+    """Get compressor from array in a version-compatible way."""
+    # v3 uses compressors property (list)
+    try:
+        compressors = array.compressors
+        if compressors and len(compressors) > 0:
+            # Report the name stored in the metadata, as the v2 codec_id is:
+            # numcodecs codecs of v2 format arrays carry a codec_id, v3 codecs
+            # serialize their name
+            compressor = compressors[0]
+            codec_id = getattr(compressor, 'codec_id', None)
+            return codec_id if codec_id is not None else compressor.to_dict()['name']
+        return None
+    except Exception:
+        return None
 
 
-def get_array_compressor(array):
+def _get_array_compressor_v2(array):
     """Get compressor from array in a version-compatible way."""
-    if IS_ZARR_V3:
-        # v3 uses compressors property (list)
+    # v2 uses compressor property
+    if hasattr(array, 'compressor') and array.compressor:
+        return array.compressor.codec_id
+    return None
+
+
+def _chunk_key_v3(array, coords) -> str:
+    """Store key of the chunk at coords, relative to the store root."""
+    key = array.metadata.encode_chunk_key(tuple(coords))
+    return f'{array.path}/{key}' if array.path else key
+
+
+def _chunk_key_v2(array, coords) -> str:
+    """Store key of the chunk at coords, relative to the store root."""
+    # v2 has no public accessor; _chunk_key already includes the array path
+    return array._chunk_key(tuple(coords))
+
+
+def _access_store_item_v3(store, key: str):
+    """Access item from store in a version-compatible way."""
+    # v3 store access might differ
+    if hasattr(store, 'get'):
+        return store.get(key)
+    elif hasattr(store, '__getitem__'):
         try:
-            compressors = array.compressors
-            if compressors and len(compressors) > 0:
-                # Return first compressor's name
-                return compressors[0].__class__.__name__.lower()
-            return None
-        except Exception:
+            return store[key]
+        except KeyError:
             return None
     else:
-        # v2 uses compressor property
-        if hasattr(array, 'compressor') and array.compressor:
-            return array.compressor.codec_id
         return None
 
 
-def access_store_item(store, key: str):
+def _access_store_item_v2(store, key: str):
     """Access item from store in a version-compatible way."""
-    if IS_ZARR_V3:
-        # v3 store access might differ
-        if hasattr(store, 'get'):
-            return store.get(key)
-        elif hasattr(store, '__getitem__'):
-            try:
-                return store[key]
-            except KeyError:
-                return None
+    # v2 store access
+    if key in store:
+        return store[key]
+    return None
+
+
+def _store_contains_v3(store, key: str) -> bool:
+    """Check if store contains key in a version-compatible way."""
+    # v3 might not support 'in' operator for all store types
+    try:
+        if hasattr(store, '__contains__'):
+            return key in store
+        elif hasattr(store, 'get'):
+            return store.get(key) is not None
         else:
-            return None
-    else:
-        # v2 store access
-        if key in store:
-            return store[key]
-        return None
+            # Try to access and catch exception
+            try:
+                _ = store[key]
+                return True
+            except Exception:
+                return False
+    except Exception:
+        return False
 
 
-def store_contains(store, key: str) -> bool:
+def _store_contains_v2(store, key: str) -> bool:
     """Check if store contains key in a version-compatible way."""
-    if IS_ZARR_V3:
-        # v3 might not support 'in' operator for all store types
-        try:
-            if hasattr(store, '__contains__'):
-                return key in store
-            elif hasattr(store, 'get'):
-                return store.get(key) is not None
-            else:
-                # Try to access and catch exception
-                try:
-                    _ = store[key]
-                    return True
-                except Exception:
-                    return False
-        except Exception:
-            return False
-    else:
-        # v2 supports 'in' operator
-        return key in store
+    # v2 supports 'in' operator
+    return key in store
 
 
-def create_array_compat(group, name: str, data=None, shape=None, dtype=None, chunks=None, **kwargs):
-    """Create array in a version-compatible way."""
-    if data is not None:
-        if shape is None:
-            shape = data.shape
-        if dtype is None:
-            dtype = data.dtype
-        if chunks is None:
-            # Default chunking
-            chunks = tuple(min(1000, s) for s in shape)
-
-    if IS_ZARR_V3:
-        # v3 requires shape and dtype
-        if shape is None or dtype is None:
-            raise ValueError("For Zarr v3, shape and dtype must be specified")
-        arr = group.create_array(name, shape=shape, dtype=dtype, chunks=chunks, **kwargs)
-        if data is not None:
+# Byte size aimed for by default chunks, so the chunk count scales with the
+# array's size in bytes rather than with its element count per axis
+_TARGET_CHUNK_BYTES = 2 * 1024 * 1024
+
+
+def _default_chunks(shape, dtype):
+    """Chunk shape of about _TARGET_CHUNK_BYTES, filling trailing axes first."""
+    remaining = max(1, _TARGET_CHUNK_BYTES // (np.dtype(dtype).itemsize or 1))
+    chunks = []
+    for size in reversed(shape):
+        chunk = max(1, min(size, remaining))
+        chunks.append(chunk)
+        remaining = max(1, remaining // chunk)
+    return tuple(reversed(chunks))
+
+
+def _parallel_write_enabled() -> bool:
+    """Whether ZARR_UTILS_PARALLEL_WRITE=1 asks for chunk writes on a thread pool."""
+    return os.environ.get('ZARR_UTILS_PARALLEL_WRITE') == '1'
+
+
+def _chunk_slabs(arr) -> list:
+    """Selections covering arr one chunk-aligned slab each."""
+    ranges = [range(0, size, chunk) for size, chunk in zip(arr.shape, arr.chunks)]
+    return [
+        tuple(slice(start, min(start + chunk, size)) for start, chunk, size in zip(starts, arr.chunks, arr.shape))
+        for starts in itertools.product(*ranges)
+    ]
+
+
+def _write_slab(arr, data, sel):
+    """Write one slab of data into arr, computing lazy inputs such as dask arrays."""
+    arr[sel] = np.asarray(data[sel])
+
+
+def _write_slabs(arr, data):
+    """Write data into arr one chunk-aligned slab at a time.
+
+    Used for inputs other than NumPy arrays (dask, xarray or zarr arrays), so
+    only one slab of them is materialised at once.
+    """
+    for sel in _chunk_slabs(arr):
+        _write_slab(arr, data, sel)
+
+
+def _write_chunks_parallel(arr, data):
+    """Write data into arr one chunk-aligned slab per task on a thread pool."""
+
+    def write(sel):
+        _write_slab(arr, data, sel)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        list(pool.map(write, _chunk_slabs(arr)))
+
+
+# Elements compared per step by _is_all_fill, which bounds the size of the
+# boolean temporary built for large inputs
+_FILL_CHECK_ELEMENTS = 1 << 20
+
+
+def _is_all_fill(arr, data) -> bool:
+    """Whether data only holds the fill value of the new array arr.
+
+    Unwritten chunks already read back as the fill value, so writing such
+    data would only spend compression work and store writes. Only NumPy
+    arrays are checked; dask, xarray and zarr inputs are always written.
+    The check compares one slab of leading-axis rows at a time and stops at
+    the first slab holding other values.
+    """
+    fill_value = arr.fill_value
+    if not isinstance(data, np.ndarray) or fill_value is None:
+        return False
+    if data.shape != tuple(arr.shape) or data.size == 0:
+        return False
+    if data.ndim == 0:
+        data = data.reshape(1)
+    try:
+        is_nan = bool(np.isnan(fill_value))
+    except TypeError:
+        is_nan = False  # fill value type without NaN, e.g. integers or strings
+    rows = max(1, _FILL_CHECK_ELEMENTS // (data.size // data.shape[0]))
+    try:
+        for start in range(0, data.shape[0], rows):
+            slab = data[start : start + rows]
+            if not (np.isnan(slab).all() if is_nan else np.all(slab == fill_value)):
+                return False
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _create_v3_with_data(group, name, data, shape, dtype, chunks, **kwargs):
+    """Create a v3 array and write data into it."""
+    if shape is None:
+        shape = data.shape
+    if dtype is None:
+        dtype = data.dtype
+    if chunks is None:
+        chunks = _default_chunks(shape, dtype)
+    arr = group.create_array(name, shape=shape, dtype=dtype, chunks=chunks, **kwargs)
+    if isinstance(data, np.ndarray):
+        if not _is_all_fill(arr, data):
             arr[:] = data
+    else:
+        _write_slabs(arr, data)
+    return arr
+
+
+def _create_v3_no_data(group, name, data, shape, dtype, chunks, **kwargs):
+    """Create an empty v3 array."""
+    # v3 requires shape and dtype
+    if shape is None or dtype is None:
+        raise ValueError("For Zarr v3, shape and dtype must be specified")
+    return group.create_array(name, shape=shape, dtype=dtype, chunks=chunks, **kwargs)
+
+
+def _create_v2_with_data(group, name, data, shape, dtype, chunks, **kwargs):
+    """Create a v2 array from data."""
+    if chunks is None:
+        chunks = _default_chunks(data.shape if shape is None else shape, data.dtype if dtype is None else dtype)
+    arr = group.create_dataset(
+        name,
+        shape=data.shape if shape is None else shape,
+        dtype=data.dtype if dtype is None else dtype,
+        chunks=chunks,
+        **kwargs,
+    )
+    if _is_all_fill(arr, data):
         return arr
+    if _parallel_write_enabled():
+        # v2 writes chunks one after another, so fan them out over threads
+        _write_chunks_parallel(arr, data)
+    elif isinstance(data, np.ndarray):
+        arr[:] = data
     else:
-        # v2 can accept data parameter directly
-        if data is not None:
-            return group.create_dataset(name, data=data, chunks=chunks, **kwargs)
-        else:
-            return group.create_dataset(name, shape=shape, dtype=dtype, chunks=chunks, **kwargs)
+        _write_slabs(arr, data)
+    return arr
+
+
+def _create_v2_no_data(group, name, data, shape, dtype, chunks, **kwargs):
+    """Create an empty v2 array."""
+    return group.create_dataset(name, shape=shape, dtype=dtype, chunks=chunks, **kwargs)
+
+
+# Array creation specialised by (Zarr v3, data given)
+_CREATE_IMPLS = {
+    (True, True): _create_v3_with_data,
+    (True, False): _create_v3_no_data,
+    (False, True): _create_v2_with_data,
+    (False, False): _create_v2_no_data,
+}
+
+
+def create_array_compat(group, name: str, data=None, shape=None, dtype=None, chunks=None, **kwargs):
+    """Create array in a version-compatible way."""
+    return _CREATE_IMPLS[IS_ZARR_V3, data is not None](group, name, data, shape, dtype, chunks, **kwargs)
+
 
+# The installed Zarr version cannot change while the process runs, so the
+# version-specific implementations are bound once here rather than checking
+# IS_ZARR_V3 on every call
+if IS_ZARR_V3:
+    open_consolidated_prefetched = _open_consolidated_prefetched_v3
+    consolidate_metadata = _consolidate_metadata_v3
+    get_array_compressor = _get_array_compressor_v3
+    chunk_key = _chunk_key_v3
+    access_store_item = _access_store_item_v3
+    store_contains = _store_contains_v3
+else:
+    open_consolidated_prefetched = _open_consolidated_prefetched_v2
+    consolidate_metadata = _consolidate_metadata_v2
+    get_array_compressor = _get_array_compressor_v2
+    chunk_key = _chunk_key_v2
+    access_store_item = _access_store_item_v2
+    store_contains = _store_contains_v2
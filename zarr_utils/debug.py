@@ -1,39 +1,147 @@
+import copy
+import itertools
+import math
+import re
 import time
-import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from typing import Any, Optional
 
 import fsspec
 import zarr
 
+from .compat import chunk_key, json_loads, open_consolidated_prefetched
+
+# Reports from diagnose_zarr_store, keyed by (store_url, storage options, detailed)
+# and stored with the time.monotonic() timestamp they were produced at
+_DIAG_CACHE: dict[tuple[Any, ...], tuple[float, dict[str, Any]]] = {}
+
+# Keyword categories recognised by explain_zarr_error
+_ERROR_PATTERN = re.compile(
+    r"(?P<zmetadata>\.zmetadata)"
+    r"|(?P<permission>permission|forbidden|access denied)"
+    r"|(?P<not_found>not found)"
+    r"|(?P<codec>codec|compressor)"
+    r"|(?P<shape>shape|dimension)"
+    r"|(?P<network>connection|timeout)"
+    r"|(?P<zarr>zarr)",
+    re.IGNORECASE,
+)
+
+# Explanation and suggestions for each explain_zarr_error category
+_ERROR_HELP: dict[str, tuple[str, tuple[str, ...]]] = {
+    "zmetadata": (
+        "The Zarr store is missing consolidated metadata.",
+        (
+            "Run: zarr_utils.consolidate_metadata('path/to/store')",
+            "Or open without consolidation: zarr.open_group(store, mode='r')",
+        ),
+    ),
+    "permission": (
+        "You don't have permission to access this store.",
+        (
+            "Check your credentials (AWS_ACCESS_KEY_ID, etc.)",
+            "For public S3 data, use: storage_options={'anon': True}",
+            "Verify the bucket/path exists and is accessible",
+        ),
+    ),
+    "not_found": (
+        "The specified Zarr store or array doesn't exist.",
+        (
+            "Check the path/URL for typos",
+            "Ensure the store exists at the specified location",
+            "For S3, verify the bucket name and key",
+        ),
+    ),
+    "codec": (
+        "The Zarr array uses a compression codec that isn't available.",
+        (
+            "Install required compression libraries (e.g., pip install blosc)",
+            "Check which codec is needed with zarr.open_array(store).compressor",
+        ),
+    ),
+    "shape": (
+        "There's a mismatch in array dimensions or shape.",
+        (
+            "Verify the expected dimensions match the actual array shape",
+            "Use inspect_zarr_store() to see array shapes",
+            "Check if you're accessing the right array/group",
+        ),
+    ),
+    "network": (
+        "Network connection issue when accessing remote store.",
+        (
+            "Check your internet connection",
+            "Try increasing timeout: storage_options={'timeout': 60}",
+            "For S3, check your AWS region settings",
+        ),
+    ),
+    "zarr": (
+        "The store may not be a valid Zarr format.",
+        (
+            "Verify this is actually a Zarr store",
+            "Try diagnose_zarr_store() for detailed analysis",
+            "Check if it's a Zarr v2 vs v3 compatibility issue",
+        ),
+    ),
+}
+
+# Metadata documents that can sit at the root of a v2 or v3 store
+_ROOT_METADATA_KEYS = (".zmetadata", ".zgroup", ".zarray", ".zattrs", "zarr.json")
+
+
+class OpRecord:
+    """Timing record for a single operation tracked by ZarrDebugger."""
+
+    __slots__ = ("name", "duration_ns", "success", "error")
+
+    def __init__(
+        self, name: str, duration_ns: int, success: bool, error: Optional[str] = None
+    ) -> None:
+        self.name = name
+        self.duration_ns = duration_ns
+        self.success = success
+        self.error = error
+
+    @property
+    def duration(self) -> float:
+        """Duration of the operation in seconds."""
+        return self.duration_ns / 1e9
+
+    def __repr__(self) -> str:
+        return (
+            f"OpRecord(name={self.name!r}, duration_ns={self.duration_ns}, "
+            f"success={self.success}, error={self.error!r})"
+        )
+
 
 class ZarrDebugger:
     """Enhanced error messages and debugging for Zarr operations."""
 
-    def __init__(self, verbose: bool = True):
+    def __init__(self, verbose: bool = True, maxlen: Optional[int] = 10000):
         self.verbose = verbose
-        self.operation_times: list[dict[str, Any]] = []
+        # Only the most recent ``maxlen`` operations are kept (None keeps all)
+        self.operation_times: deque[OpRecord] = deque(maxlen=maxlen)
 
     @contextmanager
     def operation(self, name: str):
         """Context manager to track and debug operations."""
-        start = time.time()
+        start = time.perf_counter_ns()
         if self.verbose:
             print(f"→ Starting: {name}")
 
         try:
             yield
-            duration = time.time() - start
-            self.operation_times.append({"name": name, "duration": duration, "success": True})
+            duration_ns = time.perf_counter_ns() - start
+            self.operation_times.append(OpRecord(name, duration_ns, True))
             if self.verbose:
-                print(f"✓ Completed: {name} ({duration:.2f}s)")
+                print(f"✓ Completed: {name} ({duration_ns / 1e9:.2f}s)")
         except Exception as e:
-            duration = time.time() - start
-            self.operation_times.append(
-                {"name": name, "duration": duration, "success": False, "error": str(e)}
-            )
+            duration_ns = time.perf_counter_ns() - start
+            self.operation_times.append(OpRecord(name, duration_ns, False, str(e)))
             if self.verbose:
-                print(f"✗ Failed: {name} ({duration:.2f}s)")
+                print(f"✗ Failed: {name} ({duration_ns / 1e9:.2f}s)")
             raise
 
     def summarize(self):
@@ -41,28 +149,99 @@ class ZarrDebugger:
         if not self.operation_times:
             return
 
-        print("\nOperation Summary:")
-        print("=" * 60)
-
-        total_time = sum(op["duration"] for op in self.operation_times)
-        successful = sum(1 for op in self.operation_times if op["success"])
+        total_ns = 0
+        successful = 0
+        for op in self.operation_times:
+            total_ns += op.duration_ns
+            successful += op.success
+        total_time = total_ns / 1e9
         failed = len(self.operation_times) - successful
 
-        print(f"Total operations: {len(self.operation_times)}")
-        print(f"Successful: {successful}")
-        print(f"Failed: {failed}")
-        print(f"Total time: {total_time:.2f}s")
-
-        print("\nDetailed breakdown:")
+        lines = [
+            "\nOperation Summary:",
+            "=" * 60,
+            f"Total operations: {len(self.operation_times)}",
+            f"Successful: {successful}",
+            f"Failed: {failed}",
+            f"Total time: {total_time:.2f}s",
+            "\nDetailed breakdown:",
+        ]
         for op in self.operation_times:
-            status = "✓" if op["success"] else "✗"
-            print(f"  {status} {op['name']}: {op['duration']:.2f}s")
-            if not op["success"]:
-                print(f"    Error: {op.get('error', 'Unknown error')}")
+            status = "✓" if op.success else "✗"
+            lines.append(f"  {status} {op.name}: {op.duration:.2f}s")
+            if not op.success:
+                lines.append(f"    Error: {op.error or 'Unknown error'}")
+
+        # Emit the whole summary with a single write
+        print("\n".join(lines))
+
+
+def _diag_cache_key(
+    store_url: str, storage_options: Optional[dict[str, Any]], detailed: bool
+) -> tuple[Any, ...]:
+    """Build a hashable cache key for a diagnose_zarr_store call."""
+    # repr() keeps the key hashable when option values are dicts or lists
+    opts = tuple(sorted((key, repr(value)) for key, value in (storage_options or {}).items()))
+    return (store_url, opts, detailed)
+
+
+def _sample_chunk_keys(arr: Any, root: str, count: int = 2) -> list[str]:
+    """Full paths of the first ``count`` chunks of an array, taken from its metadata."""
+    grid = [math.ceil(size / chunk) for size, chunk in zip(arr.shape, arr.chunks)]
+    coords = itertools.islice(itertools.product(*map(range, grid)), count)
+    return [f"{root.rstrip('/')}/{chunk_key(arr, coord)}" for coord in coords]
+
+
+def _probe_read(root: Any, path: str) -> dict[str, Any]:
+    """Read a small slice of an array to check that its chunks can be decoded."""
+    result = {}
+    try:
+        arr = root[path]
+        # Try to read a small chunk
+        if hasattr(arr, "chunks"):
+            result["chunks"] = arr.chunks
+            _ = arr[tuple(slice(0, min(10, s)) for s in arr.shape)]
+            result["readable"] = True
+    except Exception as e:
+        result["readable"] = False
+        result["read_error"] = str(e)
+    return result
+
+
+def _has_consolidated(blobs: dict[str, bytes]) -> bool:
+    """Whether fetched root metadata documents include consolidated metadata."""
+    if ".zmetadata" in blobs:
+        return True
+    if "zarr.json" in blobs:
+        try:
+            return json_loads(blobs["zarr.json"]).get("consolidated_metadata") is not None
+        except (ValueError, AttributeError):
+            # Leave unreadable documents for zarr to report
+            return True
+    return False
+
+
+def invalidate_diagnose_cache(store_url: Optional[str] = None) -> None:
+    """
+    Drop cached diagnose_zarr_store reports.
+
+    Parameters
+    ----------
+    store_url : str, optional
+        Only drop reports for this store. If None, the whole cache is cleared.
+    """
+    if store_url is None:
+        _DIAG_CACHE.clear()
+        return
+    for key in [key for key in _DIAG_CACHE if key[0] == store_url]:
+        del _DIAG_CACHE[key]
 
 
 def diagnose_zarr_store(
-    store_url: str, storage_options: Optional[dict[str, Any]] = None, detailed: bool = True
+    store_url: str,
+    storage_options: Optional[dict[str, Any]] = None,
+    detailed: bool = True,
+    cache_ttl: float = 0.0,
 ) -> dict[str, Any]:
     """
     Comprehensive diagnostic tool for Zarr stores.
@@ -75,12 +254,26 @@ def diagnose_zarr_store(
         Additional storage options
     detailed : bool, optional
         Include detailed diagnostics (default: True)
+    cache_ttl : float, optional
+        Reuse a report produced for the same store, options and ``detailed``
+        flag within the last ``cache_ttl`` seconds instead of re-running the
+        diagnostics. 0 disables caching (default: 0.0). Use
+        invalidate_diagnose_cache() to drop cached reports early.
 
     Returns
     -------
     dict
-        Diagnostic report
+        Diagnostic report. Root metadata documents are fetched in one batch
+        and the store root is only listed when none of them exist, so
+        ``file_count`` (the number of entries at the root) is only reported
+        for stores without root metadata.
     """
+    cache_key = _diag_cache_key(store_url, storage_options, detailed)
+    if cache_ttl > 0:
+        cached = _DIAG_CACHE.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+            return copy.deepcopy(cached[1])
+
     debugger = ZarrDebugger(verbose=detailed)
     report = {
         "store_url": store_url,
@@ -96,7 +289,7 @@ def diagnose_zarr_store(
     with debugger.operation("Check store accessibility"):
         try:
             storage_options = storage_options or {}
-            fs, path = fsspec.core.url_to_fs(store_url, **storage_options)
+            fs, fs_path = fsspec.core.url_to_fs(store_url, **storage_options)
 
             if store_url.startswith("s3://"):
                 report["store_type"] = "S3"
@@ -107,14 +300,26 @@ def diagnose_zarr_store(
             else:
                 report["store_type"] = "Local filesystem"
 
-            # Try to list files
+            # Fetch the root metadata documents in one batched request; only
+            # list the directory when none of them exist
             try:
-                files = fs.ls(path)
+                fetched = fs.cat(
+                    [f"{fs_path.rstrip('/')}/{key}" for key in _ROOT_METADATA_KEYS],
+                    on_error="omit",
+                )
+            except Exception:
+                fetched = {}
+            blobs = {key.rsplit("/", 1)[-1]: blob for key, blob in fetched.items()}
+            if blobs:
                 report["accessible"] = True
-                report["file_count"] = len(files)
-            except Exception as e:
-                report["issues"].append(f"Cannot list files: {e}")
-                report["suggestions"].append("Check permissions and credentials")
+            else:
+                try:
+                    files = fs.ls(fs_path)
+                    report["accessible"] = True
+                    report["file_count"] = len(files)
+                except Exception as e:
+                    report["issues"].append(f"Cannot list files: {e}")
+                    report["suggestions"].append("Check permissions and credentials")
 
         except Exception as e:
             report["issues"].append(f"Cannot access store: {e}")
@@ -125,24 +330,30 @@ def diagnose_zarr_store(
     root = None
     mapper = None
 
-    # Get the mapper first
+    # Reuse the filesystem instance for the mapper
     try:
-        mapper = fsspec.get_mapper(store_url, **storage_options)
+        mapper = fs.get_mapper(fs_path)
     except Exception as e:
         report["issues"].append(f"Cannot create mapper: {e}")
         return report
 
-    with debugger.operation("Try opening with consolidated metadata"):
-        try:
-            root = zarr.open_consolidated(mapper, mode="r")
-            report["has_consolidated_metadata"] = True
-        except KeyError:
-            report["issues"].append("Missing consolidated metadata (.zmetadata)")
-            report["suggestions"].append("Run consolidate_metadata() to create .zmetadata")
-            report["has_consolidated_metadata"] = False
-        except Exception as e:
-            report["issues"].append(f"Error opening with consolidated metadata: {e}")
-            report["has_consolidated_metadata"] = False
+    if blobs and not _has_consolidated(blobs):
+        # The batched fetch already shows there is nothing to open
+        report["issues"].append("Missing consolidated metadata (.zmetadata)")
+        report["suggestions"].append("Run consolidate_metadata() to create .zmetadata")
+        report["has_consolidated_metadata"] = False
+    else:
+        with debugger.operation("Try opening with consolidated metadata"):
+            try:
+                root = open_consolidated_prefetched(mapper, blobs.get(".zmetadata"))
+                report["has_consolidated_metadata"] = True
+            except KeyError:
+                report["issues"].append("Missing consolidated metadata (.zmetadata)")
+                report["suggestions"].append("Run consolidate_metadata() to create .zmetadata")
+                report["has_consolidated_metadata"] = False
+            except Exception as e:
+                report["issues"].append(f"Error opening with consolidated metadata: {e}")
+                report["has_consolidated_metadata"] = False
 
     if root is None:
         with debugger.operation("Try opening as group"):
@@ -186,18 +397,14 @@ def diagnose_zarr_store(
                             "size_bytes": nbytes,
                         }
 
-                        # Check array accessibility
-                        try:
-                            arr = root[path]
-                            # Try to read a small chunk
-                            if hasattr(arr, "chunks"):
-                                report["arrays"][path]["chunks"] = arr.chunks
-                                # Test read
-                                _ = arr[tuple(slice(0, min(10, s)) for s in arr.shape)]
-                                report["arrays"][path]["readable"] = True
-                        except Exception as e:
-                            report["arrays"][path]["readable"] = False
-                            report["arrays"][path]["read_error"] = str(e)
+                # Check array accessibility with the test reads running
+                # concurrently, so their requests overlap
+                probe_paths = list(report["arrays"])
+                if probe_paths:
+                    with ThreadPoolExecutor(max_workers=len(probe_paths)) as executor:
+                        results = executor.map(lambda path: _probe_read(root, path), probe_paths)
+                        for path, result in zip(probe_paths, results):
+                            report["arrays"][path].update(result)
 
                 report["total_arrays"] = array_count
                 report["total_size_bytes"] = total_size
@@ -211,13 +418,13 @@ def diagnose_zarr_store(
             # Test read performance on first array
             try:
                 if report.get("arrays"):
-                    first_array_path = list(report["arrays"].keys())[0]
+                    first_array_path = next(iter(report["arrays"]))
                     arr = root[first_array_path] if not report.get("is_single_array") else root
 
                     # Time small read
-                    start = time.time()
+                    start = time.perf_counter()
                     data = arr[tuple(slice(0, min(100, s)) for s in arr.shape)]
-                    read_time = time.time() - start
+                    read_time = time.perf_counter() - start
 
                     report["performance"]["small_read_time"] = read_time
                     report["performance"]["small_read_size"] = data.nbytes
@@ -225,6 +432,24 @@ def diagnose_zarr_store(
                         data.nbytes / 1024 / 1024
                     ) / read_time
 
+                    # Fetch raw chunks concurrently to measure overlapped
+                    # throughput, then time a 1-byte read for the request latency
+                    sample = _sample_chunk_keys(arr, fs_path)
+                    start = time.perf_counter()
+                    chunk_blobs = fs.cat_ranges(sample, [0] * len(sample), [None] * len(sample))
+                    fetch_time = time.perf_counter() - start
+                    # Chunks holding only the fill value may never have been written
+                    present = [key for key, blob in zip(sample, chunk_blobs) if isinstance(blob, bytes)]
+                    if present:
+                        fetched_bytes = sum(len(blob) for blob in chunk_blobs if isinstance(blob, bytes))
+                        report["performance"]["chunk_fetch_bandwidth_mbps"] = (
+                            fetched_bytes / 1024 / 1024
+                        ) / fetch_time
+
+                        start = time.perf_counter()
+                        fs.cat_file(present[0], start=0, end=1)
+                        report["performance"]["first_byte_latency"] = time.perf_counter() - start
+
                     if read_time > 1.0:
                         report["suggestions"].append(
                             "Slow read performance detected - check network/storage"
@@ -242,9 +467,35 @@ def diagnose_zarr_store(
     if detailed:
         debugger.summarize()
 
+    if cache_ttl > 0:
+        _DIAG_CACHE[cache_key] = (time.monotonic(), copy.deepcopy(report))
+
     return report
 
 
+def _error_category(error: Exception, error_str: str) -> Optional[str]:
+    """Return the _ERROR_HELP category of an error, checking categories in priority order."""
+    if isinstance(error, PermissionError):
+        # Nothing ranks above permission errors, so the message need not be scanned
+        return "permission"
+
+    # One case-insensitive scan finds every keyword category in the message
+    matched = {match.lastgroup for match in _ERROR_PATTERN.finditer(error_str)}
+
+    if isinstance(error, KeyError) and "zmetadata" in matched:
+        return "zmetadata"
+    if "permission" in matched:
+        return "permission"
+    if isinstance(error, FileNotFoundError) or "not_found" in matched:
+        return "not_found"
+    for category in ("codec", "shape", "network"):
+        if category in matched:
+            return category
+    if type(error).__name__ == "ValueError" and "zarr" in matched:
+        return "zarr"
+    return None
+
+
 def explain_zarr_error(error: Exception, context: Optional[dict[str, Any]] = None) -> str:
     """
     Provide user-friendly explanations for common Zarr errors.
@@ -264,83 +515,14 @@ def explain_zarr_error(error: Exception, context: Optional[dict[str, Any]] = Non
     error_str = str(error)
     error_type = type(error).__name__
 
+    category = _error_category(error, error_str)
+
     explanations = []
     suggestions = []
-
-    # KeyError: '.zmetadata'
-    if isinstance(error, KeyError) and ".zmetadata" in error_str:
-        explanations.append("The Zarr store is missing consolidated metadata.")
-        suggestions.extend(
-            [
-                "Run: zarr_utils.consolidate_metadata('path/to/store')",
-                "Or open without consolidation: zarr.open_group(store, mode='r')",
-            ]
-        )
-
-    # Permission errors
-    elif isinstance(error, PermissionError) or "permission" in error_str.lower() or "forbidden" in error_str.lower() or "access denied" in error_str.lower():
-        explanations.append("You don't have permission to access this store.")
-        suggestions.extend(
-            [
-                "Check your credentials (AWS_ACCESS_KEY_ID, etc.)",
-                "For public S3 data, use: storage_options={'anon': True}",
-                "Verify the bucket/path exists and is accessible",
-            ]
-        )
-
-    # File not found
-    elif isinstance(error, FileNotFoundError) or "not found" in error_str.lower():
-        explanations.append("The specified Zarr store or array doesn't exist.")
-        suggestions.extend(
-            [
-                "Check the path/URL for typos",
-                "Ensure the store exists at the specified location",
-                "For S3, verify the bucket name and key",
-            ]
-        )
-
-    # Codec/compression errors
-    elif "codec" in error_str.lower() or "compressor" in error_str.lower():
-        explanations.append("The Zarr array uses a compression codec that isn't available.")
-        suggestions.extend(
-            [
-                "Install required compression libraries (e.g., pip install blosc)",
-                "Check which codec is needed with zarr.open_array(store).compressor",
-            ]
-        )
-
-    # Shape/dimension errors
-    elif "shape" in error_str.lower() or "dimension" in error_str.lower():
-        explanations.append("There's a mismatch in array dimensions or shape.")
-        suggestions.extend(
-            [
-                "Verify the expected dimensions match the actual array shape",
-                "Use inspect_zarr_store() to see array shapes",
-                "Check if you're accessing the right array/group",
-            ]
-        )
-
-    # Connection errors
-    elif "connection" in error_str.lower() or "timeout" in error_str.lower():
-        explanations.append("Network connection issue when accessing remote store.")
-        suggestions.extend(
-            [
-                "Check your internet connection",
-                "Try increasing timeout: storage_options={'timeout': 60}",
-                "For S3, check your AWS region settings",
-            ]
-        )
-
-    # Generic Zarr errors
-    elif error_type == "ValueError" and "zarr" in error_str.lower():
-        explanations.append("The store may not be a valid Zarr format.")
-        suggestions.extend(
-            [
-                "Verify this is actually a Zarr store",
-                "Try diagnose_zarr_store() for detailed analysis",
-                "Check if it's a Zarr v2 vs v3 compatibility issue",
-            ]
-        )
+    if category is not None:
+        explanation, category_suggestions = _ERROR_HELP[category]
+        explanations.append(explanation)
+        suggestions.extend(category_suggestions)
 
     # Build output
     output = [f"\n❌ Error: {error_type}: {error_str}"]
@@ -358,11 +540,13 @@ def explain_zarr_error(error: Exception, context: Optional[dict[str, Any]] = Non
         for key, value in context.items():
             output.append(f"   {key}: {value}")
 
-    # Add stack trace location
-    tb = traceback.extract_tb(error.__traceback__)
-    if tb:
-        last_frame = tb[-1]
-        output.append(f"\n📄 Error occurred in: {last_frame.filename}:{last_frame.lineno}")
+    # Add stack trace location; only the innermost frame is reported, so
+    # follow tb_next to it instead of extracting the whole traceback
+    tb = error.__traceback__
+    if tb is not None:
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        output.append(f"\n📄 Error occurred in: {tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}")
 
     return "\n".join(output)
 
@@ -1,13 +1,50 @@
+import functools
 import math
+import os
+import time
+from collections import OrderedDict, deque
 from collections.abc import Generator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import PurePosixPath
-from typing import Any, Optional
+from typing import Any, NamedTuple, Optional, Union
 
 import fsspec
 import numpy as np
 import zarr
+from fsspec.implementations.local import LocalFileSystem
 
+from .compat import json_loads
 
+# Metadata requests are I/O bound, so use more threads than cores
+_MAX_WORKERS = min(32, 2 * (os.cpu_count() or 1))
+
+_SIZE_UNITS = " KMGTPE"
+
+# Most array listings kept by the cache_ttl argument of list_zarr_arrays
+_RECORDS_CACHE_SIZE = 32
+
+# Array records found by list_zarr_arrays, keyed by (store_url, storage options)
+# and stored with the time.monotonic() timestamp they were read at, least
+# recently used first
+_RECORDS_CACHE: OrderedDict[tuple[Any, ...], tuple[float, list["_ArrayRecord"]]] = OrderedDict()
+
+# fsspec caching layers selectable through the ``cache`` argument
+_CACHE_LAYERS = {
+    "block": "blockcache",
+    "simple": "simplecache",
+}
+
+
+class _ArrayRecord(NamedTuple):
+    """Path, shape, dtype and logical size of one array found in a store."""
+
+    path: str
+    shape: tuple[int, ...]
+    dtype: np.dtype
+    nbytes: int
+
+
+@functools.lru_cache(maxsize=4096)
 def _sizeof_fmt(num_bytes: int, suffix: str = "B") -> str:
     """Pretty-print bytes (e.g. 1.43 GB).
 
@@ -28,47 +65,403 @@ def _sizeof_fmt(num_bytes: int, suffix: str = "B") -> str:
     if num_bytes < 0:
         raise ValueError(f"Negative size not supported: {num_bytes}")
 
-    magnitude = int(math.log(num_bytes, 1024))
-    power = 1024**magnitude
-    val = num_bytes / power
-    unit = " KMGTPE"[magnitude]
-    return f"{val:5.2f} {unit}{suffix}"
+    # Each unit is 2**10 larger than the previous one, so the bit length gives
+    # the magnitude exactly (math.log can land just below a power of 1024)
+    magnitude = min(max(0, (int(num_bytes).bit_length() - 1) // 10), len(_SIZE_UNITS) - 1)
+    val = num_bytes / (1 << (magnitude * 10))
+    return f"{val:5.2f} {_SIZE_UNITS[magnitude]}{suffix}"
+
+
+def _scan_group(
+    group: zarr.Group, path: str
+) -> tuple[list[_ArrayRecord], list[tuple[zarr.Group, str]]]:
+    """Collect the arrays and subgroups directly below a single group.
+
+    Parameters
+    ----------
+    group : zarr.Group
+        Zarr group to scan
+    path : str
+        Path of ``group`` relative to the store root
+
+    Returns
+    -------
+    tuple
+        Records for the arrays in ``group`` and (subgroup, path) pairs still
+        to be scanned
+    """
+    arrays = []
+    for name, array in group.arrays():
+        full = f"{path}/{name}" if path else name
+        nbytes = array.dtype.itemsize * math.prod(array.shape)
+        arrays.append(_ArrayRecord(full, array.shape, array.dtype, nbytes))
+    subgroups = [(sub, f"{path}/{name}" if path else name) for name, sub in group.groups()]
+    return arrays, subgroups
+
+
+def _warn_walk_error(path: str, error: Exception) -> None:
+    """Log a group that could not be scanned; the walk continues with other groups."""
+    import warnings
+
+    warnings.warn(f"Error walking group at path '{path}': {str(error)}", stacklevel=3)
 
 
 def _walk_group(
-    group: zarr.Group, path: str = ""
-) -> Generator[tuple[str, tuple[int, ...], np.dtype, int], None, None]:
+    group: zarr.Group, path: str = "", max_workers: Optional[int] = None
+) -> Generator[_ArrayRecord, None, None]:
     """Yield (path, shape, dtype, nbytes) for every array in the Zarr group.
 
+    Subgroups are scanned concurrently on a thread pool, so on remote stores
+    the metadata requests for sibling groups overlap instead of running one
+    after another. Arrays are yielded as soon as their group has been scanned,
+    which means the order is not guaranteed to be depth-first.
+
     Parameters
     ----------
     group : zarr.Group
         Zarr group to walk
     path : str, optional
         Current path prefix
+    max_workers : int, optional
+        Maximum number of groups scanned concurrently
+        (default: ``min(32, 2 * os.cpu_count())``). With 1, groups are
+        scanned breadth-first on the calling thread.
 
     Yields
     ------
-    Tuple[str, Tuple[int, ...], np.dtype, int]
+    _ArrayRecord
         Array path, shape, dtype, and size in bytes
     """
+    if max_workers is not None and max_workers <= 1:
+        # Without concurrency a plain work queue avoids the thread pool
+        queue = deque([(group, path)])
+        while queue:
+            current, group_path = queue.popleft()
+            try:
+                arrays, subgroups = _scan_group(current, group_path)
+            except Exception as e:
+                _warn_walk_error(group_path, e)
+                continue
+            yield from arrays
+            queue.extend(subgroups)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers or _MAX_WORKERS) as executor:
+        pending = {executor.submit(_scan_group, group, path): path}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                group_path = pending.pop(future)
+                try:
+                    arrays, subgroups = future.result()
+                except Exception as e:
+                    _warn_walk_error(group_path, e)
+                    continue
+
+                yield from arrays
+                for sub, sub_path in subgroups:
+                    pending[executor.submit(_scan_group, sub, sub_path)] = sub_path
+
+
+def _read_consolidated(mapper: Any) -> Optional[list[_ArrayRecord]]:
+    """Build array records straight from a store's consolidated metadata.
+
+    Consolidated metadata describes the whole hierarchy, so a single request
+    replaces the per-group walk. Zarr v2 format stores keep it in
+    ``.zmetadata``, v3 format stores inline in the root ``zarr.json``.
+
+    Parameters
+    ----------
+    mapper : fsspec.mapping.FSMap
+        Mapper pointing at the store root
+
+    Returns
+    -------
+    list or None
+        Array records, or None if the store has no usable consolidated
+        metadata
+    """
+    raw = mapper.get(".zmetadata")
+    records = []
     try:
-        for name, array in group.arrays():
-            full = f"{path}/{name}" if path else name
-            nbytes = array.dtype.itemsize * int(np.prod(array.shape))
-            yield full, array.shape, array.dtype, nbytes
-        for name, sub in group.groups():
-            sub_path = f"{path}/{name}" if path else name
-            yield from _walk_group(sub, sub_path)
+        if raw is not None:
+            metadata = json_loads(raw)["metadata"]
+            for key, meta in metadata.items():
+                if key != ".zarray" and not key.endswith("/.zarray"):
+                    continue
+                path = key[: -len(".zarray")].rstrip("/") or "array"
+                records.append(_record_from_metadata(path, meta["shape"], meta["dtype"]))
+            return records
+
+        raw = mapper.get("zarr.json")
+        if raw is None:
+            return None
+        consolidated = json_loads(raw).get("consolidated_metadata")
+        if not consolidated:
+            return None
+        for path, meta in consolidated["metadata"].items():
+            if meta.get("node_type") == "array":
+                records.append(_record_from_metadata(path, meta["shape"], meta["data_type"]))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return records
+
+
+def _record_from_metadata(path: str, shape: list[int], dtype_spec: Any) -> _ArrayRecord:
+    """Build an array record from the shape and dtype fields of array metadata.
+
+    Parameters
+    ----------
+    path : str
+        Array path within the store
+    shape : list of int
+        ``shape`` field of the array metadata
+    dtype_spec : str or list
+        ``dtype`` (v2) or ``data_type`` (v3) field of the array metadata
+
+    Returns
+    -------
+    _ArrayRecord
+        Record for the array
+
+    Raises
+    ------
+    TypeError
+        If the dtype cannot be interpreted by NumPy
+    """
+    if isinstance(dtype_spec, list):
+        # Structured dtypes are stored as lists of [name, type(, shape)]
+        dtype_spec = [tuple(field) for field in dtype_spec]
+    dtype = np.dtype(dtype_spec)
+    shape = tuple(shape)
+    return _ArrayRecord(path, shape, dtype, dtype.itemsize * math.prod(shape))
+
+
+def _read_node_metadata(directory: str) -> Optional[dict[str, Any]]:
+    """Read the metadata document describing a local directory as a Zarr node.
+
+    Parameters
+    ----------
+    directory : str
+        Local directory that may hold a Zarr group or array
+
+    Returns
+    -------
+    dict or None
+        Dictionary with ``node_type`` ("array" or "group") and, for arrays,
+        ``shape`` and ``dtype``; None if the directory is not a Zarr node
+    """
+    for name in (".zarray", ".zgroup", "zarr.json"):
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                meta = json_loads(f.read())
+        except FileNotFoundError:
+            continue
+        if name == ".zarray":
+            return {"node_type": "array", "shape": meta["shape"], "dtype": meta["dtype"]}
+        if name == ".zgroup":
+            return {"node_type": "group"}
+        if meta.get("node_type") == "array":
+            return {"node_type": "array", "shape": meta["shape"], "dtype": meta["data_type"]}
+        return {"node_type": meta.get("node_type")}
+    return None
+
+
+def _scan_local(root: str) -> Optional[list[_ArrayRecord]]:
+    """Build array records for a local store by reading its metadata files.
+
+    The directory tree is walked with ``os.scandir`` and each ``.zarray``,
+    ``.zgroup`` or ``zarr.json`` document is parsed directly, which avoids
+    opening every group and array through zarr. Chunk directories below
+    arrays are never entered.
+
+    Parameters
+    ----------
+    root : str
+        Local path to the store root
+
+    Returns
+    -------
+    list or None
+        Array records, or None if the store uses metadata this scan does not
+        understand and must be opened through zarr instead
+    """
+    try:
+        root_meta = _read_node_metadata(root)
+        if root_meta is None:
+            return None
+        if root_meta["node_type"] == "array":
+            return [_record_from_metadata("array", root_meta["shape"], root_meta["dtype"])]
+        if root_meta["node_type"] != "group":
+            return None
+
+        records = []
+        pending = deque([(root, "")])
+        while pending:
+            directory, path = pending.popleft()
+            with os.scandir(directory) as it:
+                entries = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+            for entry in entries:
+                meta = _read_node_metadata(entry.path)
+                if meta is None:
+                    continue
+                full = f"{path}/{entry.name}" if path else entry.name
+                if meta["node_type"] == "array":
+                    records.append(_record_from_metadata(full, meta["shape"], meta["dtype"]))
+                elif meta["node_type"] == "group":
+                    pending.append((entry.path, full))
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+    return records
+
+
+def _get_mapper(
+    store_url: str, storage_options: dict[str, Any], cache: Optional[str] = None
+) -> Any:
+    """Create an fsspec mapper for a store, optionally behind a caching layer.
+
+    Parameters
+    ----------
+    store_url : str
+        Path or URL to the store
+    storage_options : dict
+        Options for the filesystem that holds the store
+    cache : str, optional
+        ``"block"`` caches the blocks read from remote files locally through
+        ``blockcache::``, in the block size of the store's filesystem;
+        ``"simple"`` downloads whole files once through ``simplecache::``.
+        None (default) reads the store directly.
+
+    Returns
+    -------
+    fsspec.mapping.FSMap
+        Mapper pointing at the store root
+
+    Raises
+    ------
+    ValueError
+        If ``cache`` is not a known caching mode
+    """
+    if cache is None:
+        return fsspec.get_mapper(store_url, **storage_options)
+    if cache not in _CACHE_LAYERS:
+        raise ValueError(f"Unknown cache mode {cache!r}, expected one of {sorted(_CACHE_LAYERS)}")
+
+    protocol = fsspec.utils.get_protocol(store_url)
+    return fsspec.get_mapper(f"{_CACHE_LAYERS[cache]}::{store_url}", **{protocol: storage_options})
+
+
+def _open_root(mapper: Any, try_consolidated: bool = True) -> Union[zarr.Group, zarr.Array]:
+    """Open the root of a store as a group, falling back to a single array.
+
+    Parameters
+    ----------
+    mapper : fsspec.mapping.FSMap
+        Mapper pointing at the store root
+    try_consolidated : bool, optional
+        Attempt zarr.open_consolidated first (default: True). Callers that
+        already know the store has no ``.zmetadata`` can skip the attempt and
+        its extra request.
+
+    Returns
+    -------
+    zarr.Group or zarr.Array
+        The opened root node
+
+    Raises
+    ------
+    ValueError
+        If the store cannot be opened by any strategy
+    """
+    errors = []
+
+    # Strategy 1: Try consolidated metadata
+    if try_consolidated:
+        try:
+            return zarr.open_consolidated(mapper, mode="r")
+        except Exception as e:
+            errors.append(("consolidated", str(e)))
+
+    # Strategy 2: Try as group
+    try:
+        return zarr.open_group(mapper, mode="r")
+    except Exception as e:
+        errors.append(("group", str(e)))
+
+    # Strategy 3: Try as array
+    try:
+        return zarr.open_array(mapper, mode="r")
     except Exception as e:
-        # Log the error but continue walking other arrays
-        import warnings
+        errors.append(("array", str(e)))
 
-        warnings.warn(f"Error walking group at path '{path}': {str(e)}", stacklevel=2)
+    error_msg = "Failed to open Zarr store. Tried:\n"
+    for method, error in errors:
+        error_msg += f"  - {method}: {error}\n"
+    raise ValueError(error_msg)
+
+
+def _find_records(
+    store_url: str, opts: dict[str, Any], cache: Optional[str], max_workers: Optional[int]
+) -> list[_ArrayRecord]:
+    """Collect records for every array in a store, using the cheapest available source."""
+    mapper = _get_mapper(store_url, opts, cache=cache)
+
+    # Fast path: consolidated metadata lists every array in one request
+    records = _read_consolidated(mapper)
+
+    if records is None and isinstance(mapper.fs, LocalFileSystem):
+        # Local stores can be enumerated straight from their metadata files
+        records = _scan_local(mapper.root)
+
+    if records is None:
+        # .zmetadata was just found missing or unreadable, so opening it again
+        # through zarr.open_consolidated would only repeat the failed request
+        root = _open_root(mapper, try_consolidated=False)
+        if not isinstance(root, zarr.Group):
+            # Report a single array store under the name "array"
+            nbytes = root.dtype.itemsize * math.prod(root.shape)
+            return [_ArrayRecord("array", root.shape, root.dtype, nbytes)]
+        records = list(_walk_group(root, max_workers=max_workers))
+    return records
+
+
+def _records_cache_key(store_url: str, opts: dict[str, Any]) -> tuple[Any, ...]:
+    """Build a hashable _RECORDS_CACHE key for a store and its storage options."""
+    # repr() keeps the key hashable when option values are dicts or lists
+    return (store_url, tuple(sorted((key, repr(value)) for key, value in opts.items())))
+
+
+def clear_metadata_cache(store_url: Optional[str] = None) -> None:
+    """
+    Drop metadata cached through the ``cache_ttl`` arguments.
+
+    This covers array listings cached by list_zarr_arrays and
+    inspect_zarr_store, and .zmetadata documents cached by
+    consolidate_metadata and validate_metadata.
+
+    Parameters
+    ----------
+    store_url : str, optional
+        Only drop entries for this store. If None, the whole cache is cleared.
+    """
+    # Imported here since the metadata module imports this one
+    from .metadata import _ZMETADATA_CACHE
+
+    for cache in (_RECORDS_CACHE, _ZMETADATA_CACHE):
+        if store_url is None:
+            cache.clear()
+            continue
+        for key in [key for key in cache if key[0] == store_url]:
+            del cache[key]
 
 
 def list_zarr_arrays(
-    store_url: str, anon: bool = True, storage_options: Optional[dict[str, Any]] = None
+    store_url: str,
+    anon: bool = True,
+    storage_options: Optional[dict[str, Any]] = None,
+    cache: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    cache_ttl: float = 0.0,
 ) -> list[dict[str, Any]]:
     """
     List all arrays in a Zarr store, including nested groups.
@@ -79,6 +472,20 @@ def list_zarr_arrays(
         Path or S3 URL to a Zarr store or group
     anon : bool
         If using a remote store (e.g. S3), set to True for anonymous access
+    storage_options : dict, optional
+        Additional options passed to the filesystem
+    cache : str, optional
+        Read the store through an fsspec caching layer: ``"block"`` caches
+        the blocks read from remote files locally, ``"simple"`` caches whole
+        files locally (default: None)
+    max_workers : int, optional
+        Maximum number of groups scanned concurrently when the hierarchy has
+        to be walked (default: ``min(32, 2 * os.cpu_count())``)
+    cache_ttl : float, optional
+        Reuse the arrays found for the same store and options within the last
+        ``cache_ttl`` seconds instead of reading its metadata again. 0
+        disables caching (default: 0.0). Use clear_metadata_cache() to drop
+        cached listings early.
 
     Returns
     -------
@@ -89,61 +496,41 @@ def list_zarr_arrays(
     if storage_options:
         opts.update(storage_options)
 
-    mapper = fsspec.get_mapper(store_url, **opts)
+    cache_key = _records_cache_key(store_url, opts)
+    records = None
+    if cache_ttl > 0:
+        cached = _RECORDS_CACHE.get(cache_key)
+        if cached is not None:
+            if time.monotonic() - cached[0] < cache_ttl:
+                _RECORDS_CACHE.move_to_end(cache_key)
+                records = cached[1]
+            else:
+                del _RECORDS_CACHE[cache_key]
 
-    # Try multiple strategies to open the store
-    root = None
-    errors = []
+    if records is None:
+        records = _find_records(store_url, opts, cache, max_workers)
+        if cache_ttl > 0:
+            _RECORDS_CACHE[cache_key] = (time.monotonic(), records)
+            _RECORDS_CACHE.move_to_end(cache_key)
+            while len(_RECORDS_CACHE) > _RECORDS_CACHE_SIZE:
+                _RECORDS_CACHE.popitem(last=False)
 
-    # Strategy 1: Try consolidated metadata
-    try:
-        root = zarr.open_consolidated(mapper, mode="r")
-    except Exception as e:
-        errors.append(("consolidated", str(e)))
-
-    # Strategy 2: Try as group
-    if root is None:
-        try:
-            root = zarr.open_group(mapper, mode="r")
-        except Exception as e:
-            errors.append(("group", str(e)))
-
-    # Strategy 3: Try as array
-    if root is None:
-        try:
-            arr = zarr.open_array(mapper, mode="r")
-            # Wrap single array in a fake group structure
-            arrays = [
-                {
-                    "path": "array",
-                    "shape": arr.shape,
-                    "dtype": str(arr.dtype),
-                    "size_bytes": arr.dtype.itemsize * int(np.prod(arr.shape)),
-                }
-            ]
-            return arrays
-        except Exception as e:
-            errors.append(("array", str(e)))
-
-    if root is None:
-        error_msg = "Failed to open Zarr store. Tried:\n"
-        for method, error in errors:
-            error_msg += f"  - {method}: {error}\n"
-        raise ValueError(error_msg)
+    # Sort by size descending; a stable argsort on the negated sizes keeps
+    # equally sized arrays in walk order
+    sizes = np.fromiter((r.nbytes for r in records), dtype=np.int64, count=len(records))
+    order = np.argsort(-sizes, kind="stable")
 
     arrays = []
-    for path, shape, dtype, nbytes in _walk_group(root):
+    for i in order:
+        record = records[i]
         arrays.append(
             {
-                "path": path,
-                "shape": shape,
-                "dtype": str(dtype),
-                "size_bytes": nbytes,
+                "path": record.path,
+                "shape": record.shape,
+                "dtype": str(record.dtype),
+                "size_bytes": record.nbytes,
             }
         )
-
-    # Sort by size descending
-    arrays.sort(key=lambda a: a["size_bytes"], reverse=True)
     return arrays
 
 
@@ -152,6 +539,9 @@ def inspect_zarr_store(
     anon: bool = True,
     summarize: bool = True,
     storage_options: Optional[dict[str, Any]] = None,
+    cache: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    cache_ttl: float = 0.0,
 ) -> dict[str, dict[str, Any]]:
     """
     Print summary and return metadata for all arrays in a Zarr store.
@@ -164,26 +554,40 @@ def inspect_zarr_store(
         If using a remote store (e.g. S3), set to True for anonymous access
     summarize : bool
         If True, prints formatted summary
+    storage_options : dict, optional
+        Additional options passed to the filesystem
+    cache : str, optional
+        fsspec caching layer to read the store through, ``"block"`` or
+        ``"simple"``; see :func:`list_zarr_arrays` (default: None)
+    max_workers : int, optional
+        Maximum number of groups scanned concurrently; see
+        :func:`list_zarr_arrays`
+    cache_ttl : float, optional
+        Reuse a recent listing of the same store; see :func:`list_zarr_arrays`
+        (default: 0.0)
 
     Returns
     -------
     Dict[str, dict]
         Dictionary keyed by array path, with metadata for each array
     """
-    arrays = list_zarr_arrays(store_url, anon=anon, storage_options=storage_options)
-    result = {}
-    total = 0
+    arrays = list_zarr_arrays(
+        store_url,
+        anon=anon,
+        storage_options=storage_options,
+        cache=cache,
+        max_workers=max_workers,
+        cache_ttl=cache_ttl,
+    )
+    result = {arr["path"]: arr for arr in arrays}
     if summarize:
+        total = sum(arr["size_bytes"] for arr in arrays)
         store_name = PurePosixPath(store_url).name or store_url
-        print(f"\nInspecting Zarr store: {store_name}")
-        print(f"  Arrays found: {len(arrays)}")
-    for arr in arrays:
-        total += arr["size_bytes"]
-        result[arr["path"]] = arr
-        if summarize:
-            print(
-                f"  {arr['path']:<30} {arr['shape']!s:<20} {arr['dtype']}  {_sizeof_fmt(arr['size_bytes'])}"
-            )
-    if summarize:
-        print(f"  Total logical size: {_sizeof_fmt(total)}")
+        lines = [f"\nInspecting Zarr store: {store_name}", f"  Arrays found: {len(arrays)}"]
+        lines.extend(
+            f"  {arr['path']:<30} {arr['shape']!s:<20} {arr['dtype']}  {_sizeof_fmt(arr['size_bytes'])}"
+            for arr in arrays
+        )
+        lines.append(f"  Total logical size: {_sizeof_fmt(total)}")
+        print("\n".join(lines))
     return result
@@ -1,15 +1,81 @@
+import io
 import json
+import time
+from collections import OrderedDict
 from typing import Any, Optional
 
 import fsspec
+import numpy as np
 import zarr
-
-from .compat import access_store_item, get_array_compressor, store_contains
+from fsspec.implementations.local import LocalFileSystem
+
+from .compat import (
+    IS_ZARR_V3,
+    _find_metadata_keys,
+    _find_v3_metadata_keys,
+    batch_get_metadata,
+    consolidate_metadata_fast,
+    get_array_compressor,
+    json_loads,
+    write_consolidated_metadata,
+)
 from .compat import consolidate_metadata as consolidate_metadata_compat
+from .inspect import _records_cache_key, clear_metadata_cache
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# .zmetadata documents larger than this are streamed with ijson, if installed
+_STREAM_THRESHOLD = 4 * 2**20
+
+# Most .zmetadata documents kept by the cache_ttl arguments
+_ZMETADATA_CACHE_SIZE = 32
+
+# Raw .zmetadata documents read by _read_zmetadata, keyed by _records_cache_key
+# and stored with the time.monotonic() timestamp they were read at, least
+# recently used first; bytes are cached so callers always parse their own copy
+_ZMETADATA_CACHE: OrderedDict[tuple[Any, ...], tuple[float, bytes]] = OrderedDict()
+
+
+def _read_zmetadata(
+    mapper, cache_key: Optional[tuple] = None, cache_ttl: float = 0.0
+) -> Optional[bytes]:
+    """Fetch the raw .zmetadata document of a store with a single request.
+
+    ``access_store_item`` checks for the key before reading it under Zarr v2,
+    which costs two round-trips on remote stores. With a positive
+    ``cache_ttl``, a document read under ``cache_key`` within that many
+    seconds is reused, and the least recently used documents are dropped
+    beyond _ZMETADATA_CACHE_SIZE.
+    """
+    if cache_ttl > 0:
+        cached = _ZMETADATA_CACHE.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < cache_ttl:
+            _ZMETADATA_CACHE.move_to_end(cache_key)
+            return cached[1]
+
+    metadata_bytes = mapper.get(".zmetadata")
+    if cache_ttl > 0 and metadata_bytes is not None:
+        _ZMETADATA_CACHE[cache_key] = (time.monotonic(), metadata_bytes)
+        _ZMETADATA_CACHE.move_to_end(cache_key)
+        while len(_ZMETADATA_CACHE) > _ZMETADATA_CACHE_SIZE:
+            _ZMETADATA_CACHE.popitem(last=False)
+    return metadata_bytes
+
+
+def _has_group_metadata(mapper) -> bool:
+    """Whether the store root holds a v2 .zgroup or a v3 zarr.json document."""
+    return bool(mapper.getitems([".zgroup", "zarr.json"], on_error="omit"))
 
 
 def consolidate_metadata(
-    store_url: str, storage_options: Optional[dict[str, Any]] = None, dry_run: bool = False
+    store_url: str,
+    storage_options: Optional[dict[str, Any]] = None,
+    dry_run: bool = False,
+    force: bool = False,
+    cache_ttl: float = 0.0,
 ) -> dict[str, Any]:
     """
     Create or repair consolidated metadata (.zmetadata) for a Zarr store.
@@ -25,6 +91,14 @@ def consolidate_metadata(
         Additional storage options (e.g., {'anon': True} for S3)
     dry_run : bool, optional
         If True, return metadata without writing .zmetadata file
+    force : bool, optional
+        If True, rebuild .zmetadata even if it already exists, e.g. after
+        attributes changed (default: False)
+    cache_ttl : float, optional
+        Reuse a .zmetadata document read from the same store and options
+        within the last ``cache_ttl`` seconds instead of fetching it again.
+        0 disables caching (default: 0.0). Writing .zmetadata, or calling
+        clear_metadata_cache(), drops the cached document.
 
     Returns
     -------
@@ -45,31 +119,47 @@ def consolidate_metadata(
     # Open the store using fsspec mapper
     mapper = fsspec.get_mapper(store_url, **storage_options)
 
-    # Try to open as consolidated first
-    try:
-        zarr.open_consolidated(mapper, mode="r")
-        # Try to access consolidated metadata
-        metadata_bytes = access_store_item(mapper, ".zmetadata")
-        if metadata_bytes:
-            if isinstance(metadata_bytes, bytes):
-                existing_metadata = json.loads(metadata_bytes.decode())
+    if force:
+        # The existing document is replaced unread, so only check for it
+        exists = mapper.fs.exists(f"{mapper.root.rstrip('/')}/.zmetadata")
+    else:
+        # A single read of .zmetadata tells whether there is anything to do
+        cache_key = _records_cache_key(store_url, storage_options)
+        metadata_bytes = _read_zmetadata(mapper, cache_key, cache_ttl)
+        exists = bool(metadata_bytes)
+        if exists:
+            try:
+                existing_metadata = json_loads(metadata_bytes)
+            except ValueError:
+                # Unreadable .zmetadata is rebuilt below
+                pass
             else:
-                existing_metadata = json.loads(metadata_bytes)
-            print(f"✓ Consolidated metadata exists at {store_url}/.zmetadata")
-            return existing_metadata
-        else:
-            raise KeyError(".zmetadata not found")
-    except (KeyError, ValueError, AttributeError):
+                print(f"✓ Consolidated metadata exists at {store_url}/.zmetadata")
+                return existing_metadata
+
+    if exists:
+        print(f"⚠ Rebuilding consolidated metadata at {store_url}/.zmetadata")
+    else:
         print(f"⚠ No consolidated metadata found at {store_url}/.zmetadata")
-        zarr.open_group(mapper, mode="r")
+    if not _has_group_metadata(mapper):
+        raise FileNotFoundError(f"No Zarr group found at {store_url}")
 
     # Generate consolidated metadata
     print("→ Scanning store and building metadata...")
 
     if not dry_run:
-        # Use the mapper to consolidate
-        consolidate_metadata_compat(mapper, metadata_key=".zmetadata")
+        # On async filesystems fetch every metadata file in one batch, and on
+        # local ones walk the directory tree directly, instead of letting zarr
+        # read them one key at a time
+        consolidated = None
+        if mapper.fs.async_impl or isinstance(mapper.fs, LocalFileSystem):
+            consolidated = consolidate_metadata_fast(store_url, storage_options)
+        if consolidated is None:
+            consolidate_metadata_compat(mapper, metadata_key=".zmetadata")
+        clear_metadata_cache(store_url)
         print(f"✓ Consolidated metadata written to {store_url}/.zmetadata")
+        if consolidated is not None:
+            return consolidated
     else:
         print("ℹ Dry run - metadata not written")
         # For dry run, just return empty dict
@@ -77,12 +167,9 @@ def consolidate_metadata(
 
     # Return the metadata dict
     try:
-        metadata_bytes = access_store_item(mapper, ".zmetadata")
+        metadata_bytes = _read_zmetadata(mapper)
         if metadata_bytes:
-            if isinstance(metadata_bytes, bytes):
-                return json.loads(metadata_bytes.decode())
-            else:
-                return json.loads(metadata_bytes)
+            return json_loads(metadata_bytes)
     except Exception:
         # Fallback - return basic info
         return {"zarr_consolidated_format": 1}
@@ -96,8 +183,180 @@ def _get_compression_info(arr) -> Optional[str]:
         return None
 
 
+# v3 codecs that serialize array values to bytes; codecs after them compress
+_ARRAY_TO_BYTES_CODECS = frozenset({"bytes", "vlen-utf8", "vlen-bytes", "sharding_indexed"})
+
+
+def _path_sort_key(path: str) -> list[str]:
+    """Sort key that orders store paths depth-first, parents before children."""
+    return path.split("/") if path else []
+
+
+# Fields every .zarray document must have
+_REQUIRED_ARRAY_FIELDS = ("shape", "dtype", "chunks")
+
+# Fields of .zarray documents that _validate_consolidated reads
+_ARRAY_FIELDS = (*_REQUIRED_ARRAY_FIELDS, "compressor")
+
+
+def _stream_consolidated(metadata_bytes: bytes) -> Optional[dict[str, Any]]:
+    """Read the documents validation needs from a large .zmetadata with ijson.
+
+    Entries of the ``metadata`` mapping are parsed one at a time, and array
+    documents are cut down to the fields _validate_consolidated reads as they
+    arrive. Attributes of arrays whose ``.zarray`` came first, as it does in
+    key-sorted .zmetadata, are cut down to their units, so the parsed result
+    stays small even for stores with many attributes.
+
+    Returns None when the document cannot be streamed, so that the caller
+    parses it with json_loads instead: ijson rejects the bare NaN/Infinity
+    attribute values json_loads accepts, and yields no entries when the
+    ``metadata`` mapping is missing.
+    """
+    metadata = {}
+    try:
+        for key, meta in ijson.kvitems(io.BytesIO(metadata_bytes), "metadata", use_float=True):
+            path, _, name = key.rpartition("/")
+            if name == ".zarray" and isinstance(meta, dict):
+                meta = {field: meta[field] for field in _ARRAY_FIELDS if field in meta}
+            elif name == ".zattrs" and f"{path}/.zarray".lstrip("/") in metadata:
+                meta = {unit: meta[unit] for unit in ("units", "unit") if unit in meta}
+            metadata[key] = meta
+    except ijson.JSONError:
+        return None
+    return metadata or None
+
+
+def _validate_consolidated(
+    metadata: dict[str, Any],
+) -> tuple[dict[str, Any], dict[str, Any], list[str]]:
+    """Validate a store from the documents in its parsed .zmetadata.
+
+    Consolidated metadata already holds every .zgroup, .zarray and .zattrs
+    document in the store, so the checks made while walking the hierarchy
+    can be made on the parsed dictionary without any further store reads.
+
+    Parameters
+    ----------
+    metadata : dict
+        The ``metadata`` mapping of a .zmetadata document
+
+    Returns
+    -------
+    tuple
+        Array info, group info and issues, in the same form as the walk in
+        validate_metadata produces them
+
+    Raises
+    ------
+    KeyError, TypeError, ValueError
+        If the documents are malformed
+    """
+    attrs = {}
+    arrays_by_parent = {}
+    group_paths = []
+    for key, meta in metadata.items():
+        path, _, name = key.rpartition("/")
+        if name == ".zattrs":
+            attrs[path] = meta
+        elif name == ".zarray":
+            arrays_by_parent.setdefault(path.rpartition("/")[0], []).append((path, meta))
+        elif name == ".zgroup":
+            group_paths.append(path)
+
+    arrays = {}
+    groups = {}
+    issues = []
+
+    if not attrs.get(""):
+        issues.append("Root group has no attributes")
+
+    for group_path in sorted(group_paths, key=_path_sort_key):
+        group_attrs = attrs.get(group_path, {})
+        group_issues = []
+        if not group_attrs:
+            group_issues.append(f"Group '{group_path or '/'}' has no attributes")
+        groups[group_path or "/"] = {"attrs": dict(group_attrs), "issues": group_issues}
+
+        for array_path, meta in sorted(arrays_by_parent.get(group_path, [])):
+            array_issues = [
+                f"Missing {field}" for field in _REQUIRED_ARRAY_FIELDS if field not in meta
+            ]
+
+            array_attrs = attrs.get(array_path, {})
+            if "units" not in array_attrs and "unit" not in array_attrs:
+                array_issues.append("No units specified in attributes")
+
+            dtype_spec = meta.get("dtype")
+            if isinstance(dtype_spec, list):
+                # Structured dtypes are stored as lists of [name, type(, shape)]
+                dtype_spec = [tuple(field) for field in dtype_spec]
+            compressor = meta.get("compressor")
+
+            arrays[array_path] = {
+                "shape": tuple(meta["shape"]) if "shape" in meta else None,
+                "dtype": str(np.dtype(dtype_spec)) if dtype_spec is not None else None,
+                "chunks": tuple(meta["chunks"]) if "chunks" in meta else None,
+                "compression": compressor["id"] if compressor else None,
+                "issues": array_issues,
+            }
+            if array_issues:
+                issues.extend([f"Array '{array_path}': {issue}" for issue in array_issues])
+
+    return arrays, groups, issues
+
+
+def _read_inline_consolidated(mapper) -> Optional[dict[str, Any]]:
+    """Return the root zarr.json document if it holds inline consolidated metadata."""
+    raw = mapper.get("zarr.json")
+    if raw is None:
+        return None
+    try:
+        document = json_loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(document, dict) or not document.get("consolidated_metadata"):
+        return None
+    return document
+
+
+def _v3_as_v2_metadata(document: dict[str, Any]) -> dict[str, Any]:
+    """Rewrite v3 inline consolidated metadata as .zmetadata style documents.
+
+    Each node of the flattened ``consolidated_metadata`` mapping becomes a
+    ``.zgroup`` or ``.zarray`` entry plus a ``.zattrs`` entry, so that
+    _validate_consolidated can check v3 format stores too. The compressor of
+    an array is the first codec following its array-to-bytes codec.
+
+    Raises
+    ------
+    KeyError, TypeError, AttributeError
+        If the documents are malformed
+    """
+    metadata = {".zgroup": {}, ".zattrs": document.get("attributes", {})}
+    for path, node in document["consolidated_metadata"]["metadata"].items():
+        metadata[f"{path}/.zattrs"] = node.get("attributes", {})
+        if node.get("node_type") != "array":
+            metadata[f"{path}/.zgroup"] = {}
+            continue
+
+        array_meta = {}
+        if "shape" in node:
+            array_meta["shape"] = node["shape"]
+        if "data_type" in node:
+            array_meta["dtype"] = node["data_type"]
+        if "chunk_grid" in node:
+            array_meta["chunks"] = node["chunk_grid"]["configuration"]["chunk_shape"]
+        names = [codec["name"] for codec in node.get("codecs", [])]
+        to_bytes = next((i for i, name in enumerate(names) if name in _ARRAY_TO_BYTES_CODECS), None)
+        compressors = names[to_bytes + 1 :] if to_bytes is not None else []
+        array_meta["compressor"] = {"id": compressors[0]} if compressors else None
+        metadata[f"{path}/.zarray"] = array_meta
+    return metadata
+
+
 def validate_metadata(
-    store_url: str, storage_options: Optional[dict[str, Any]] = None
+    store_url: str, storage_options: Optional[dict[str, Any]] = None, cache_ttl: float = 0.0
 ) -> dict[str, Any]:
     """
     Validate and report issues with Zarr store metadata.
@@ -108,6 +367,10 @@ def validate_metadata(
         Path or URL to the Zarr store
     storage_options : dict, optional
         Additional storage options
+    cache_ttl : float, optional
+        Reuse a .zmetadata document read from the same store and options
+        within the last ``cache_ttl`` seconds, as in consolidate_metadata
+        (default: 0.0, no caching)
 
     Returns
     -------
@@ -119,6 +382,52 @@ def validate_metadata(
         - 'arrays': dict - info about each array
         - 'groups': dict - info about each group
     """
+    return _validate_metadata_with_meta(store_url, storage_options, cache_ttl)[0]
+
+
+def _gather_metadata(mapper) -> Optional[dict[str, Any]]:
+    """Read every v2 metadata document of a store with one batched fetch.
+
+    Returns the documents keyed as in .zmetadata, or None for v3 format
+    stores.
+    """
+    root = mapper.root.rstrip("/")
+    keys = _find_metadata_keys(mapper.fs, root)
+    if keys is None:
+        return None
+    prefix = len(root) + 1
+    return {key[prefix:]: doc for key, doc in batch_get_metadata(mapper.fs, keys).items()}
+
+
+def _gather_v3_metadata(mapper) -> Optional[dict[str, Any]]:
+    """Read every zarr.json document of a v3 format store with one batched fetch.
+
+    The documents are rewritten as .zmetadata style documents with
+    _v3_as_v2_metadata. Returns None if the store root is not a group.
+    """
+    root = mapper.root.rstrip("/")
+    prefix = len(root) + 1
+    docs = batch_get_metadata(mapper.fs, _find_v3_metadata_keys(mapper.fs, root))
+    root_doc = docs.pop(f"{root}/zarr.json", None)
+    if root_doc is None or root_doc.get("node_type") != "group":
+        return None
+    nodes = {key[prefix : -len("/zarr.json")]: doc for key, doc in docs.items()}
+    return _v3_as_v2_metadata(
+        {"attributes": root_doc.get("attributes", {}), "consolidated_metadata": {"metadata": nodes}}
+    )
+
+
+def _validate_metadata_with_meta(
+    store_url: str, storage_options: Optional[dict[str, Any]] = None, cache_ttl: float = 0.0
+) -> tuple[dict[str, Any], Optional[dict[str, Any]]]:
+    """Validate a store, also returning its parsed consolidated metadata.
+
+    Returns the validate_metadata report together with the ``metadata``
+    mapping of .zmetadata when the report was built from it, or the v2
+    documents read in one batch when the store has no .zmetadata (None when
+    the hierarchy had to be walked), so callers can reuse the parsed
+    documents.
+    """
     issues = []
     report = {
         "valid": True,
@@ -129,35 +438,95 @@ def validate_metadata(
     }
 
     storage_options = storage_options or {}
+    consolidated = None
+    streamed = False
+    inline = None
 
     # Check for consolidated metadata
     try:
         mapper = fsspec.get_mapper(store_url, **storage_options)
 
-        # Check if .zmetadata exists
-        has_zmetadata = store_contains(mapper, ".zmetadata")
+        # Read .zmetadata once; when present it describes the whole store
+        cache_key = _records_cache_key(store_url, storage_options)
+        metadata_bytes = _read_zmetadata(mapper, cache_key, cache_ttl)
 
-        if has_zmetadata:
+        if metadata_bytes is not None:
             report["has_consolidated"] = True
             try:
-                metadata_bytes = access_store_item(mapper, ".zmetadata")
-                if metadata_bytes:
-                    if isinstance(metadata_bytes, bytes):
-                        json.loads(metadata_bytes.decode())
-                    else:
-                        json.loads(metadata_bytes)
-                    print("✓ Consolidated metadata exists and is valid JSON")
+                streamed_metadata = None
+                if ijson is not None and len(metadata_bytes) > _STREAM_THRESHOLD:
+                    streamed_metadata = _stream_consolidated(metadata_bytes)
+                if streamed_metadata is not None:
+                    consolidated = {"metadata": streamed_metadata}
+                    streamed = True
                 else:
-                    raise ValueError("Could not read .zmetadata")
-            except json.JSONDecodeError as e:
+                    consolidated = json_loads(metadata_bytes)
+                print("✓ Consolidated metadata exists and is valid JSON")
+            except ValueError as e:
                 issues.append(f"Invalid JSON in .zmetadata: {e}")
                 report["valid"] = False
         else:
-            issues.append("Missing consolidated metadata (.zmetadata)")
+            # Zarr v3 format stores keep consolidated metadata in zarr.json
+            inline = _read_inline_consolidated(mapper) if IS_ZARR_V3 else None
+            if inline is not None:
+                report["has_consolidated"] = True
+                print("✓ Consolidated metadata found in zarr.json")
+            else:
+                issues.append("Missing consolidated metadata (.zmetadata)")
     except Exception as e:
         issues.append(f"Error accessing store: {e}")
         report["valid"] = False
-        return report
+        return report, None
+
+    # Validate straight from the consolidated documents when they are usable
+    if consolidated is not None:
+        try:
+            arrays, groups, consolidated_issues = _validate_consolidated(consolidated["metadata"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            pass
+        else:
+            report["arrays"] = arrays
+            report["groups"] = groups
+            issues.extend(consolidated_issues)
+            # Streamed documents are incomplete, so they are not handed on
+            meta = None if streamed else consolidated["metadata"]
+            return _finish_validation(report, store_url), meta
+
+    if inline is not None:
+        try:
+            arrays, groups, consolidated_issues = _validate_consolidated(_v3_as_v2_metadata(inline))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            pass
+        else:
+            report["arrays"] = arrays
+            report["groups"] = groups
+            issues.extend(consolidated_issues)
+            # Attributes of v3 arrays live in zarr.json, not in .zattrs
+            # documents, so the rewritten mapping is not handed on
+            return _finish_validation(report, store_url), None
+
+    # Without consolidated metadata, fetch the metadata documents in one
+    # batch and run the same checks on them instead of opening every node
+    if not report["has_consolidated"]:
+        try:
+            metadata = _gather_metadata(mapper)
+            native = metadata is not None
+            if not native and IS_ZARR_V3:
+                metadata = _gather_v3_metadata(mapper)
+            if metadata is not None and ".zgroup" in metadata:
+                arrays, groups, batch_issues = _validate_consolidated(metadata)
+            else:
+                metadata = None
+        except Exception:
+            # Leave reporting of unreadable stores to the walk below
+            metadata = None
+        if metadata is not None:
+            report["arrays"] = arrays
+            report["groups"] = groups
+            issues.extend(batch_issues)
+            # v2 documents read straight from the store are complete and
+            # current, so callers can consolidate them as they are
+            return _finish_validation(report, store_url), metadata if native else None
 
     # Open store and validate structure
     try:
@@ -168,7 +537,7 @@ def validate_metadata(
     except Exception as e:
         issues.append(f"Error opening store: {e}")
         report["valid"] = False
-        return report
+        return report, None
 
     # Check root attributes
     if not hasattr(root, "attrs") or not root.attrs:
@@ -224,6 +593,13 @@ def validate_metadata(
     # Start validation from root
     check_group(root)
 
+    return _finish_validation(report, store_url), None
+
+
+def _finish_validation(report: dict[str, Any], store_url: str) -> dict[str, Any]:
+    """Set the overall validity of a validation report and print its summary."""
+    issues = report["issues"]
+
     # Set overall validity
     if issues:
         report["valid"] = False
@@ -263,38 +639,127 @@ def repair_metadata(
     """
     print(f"Repairing metadata for {store_url}...")
 
-    # First validate to find issues
-    report = validate_metadata(store_url, storage_options)
+    # First validate to find issues, keeping the parsed .zmetadata documents
+    report, consolidated = _validate_metadata_with_meta(store_url, storage_options)
 
     if report["valid"] and report["has_consolidated"]:
         print("✓ No repairs needed - metadata is valid")
         return
 
-    # Consolidate metadata if missing
-    if not report["has_consolidated"]:
-        print("\n→ Creating consolidated metadata...")
-        consolidate_metadata(store_url, storage_options)
-
     # Add missing attributes if requested
+    updated = []
     if add_missing_attrs and report["arrays"]:
         print("\n→ Adding missing attributes...")
-        storage_options = storage_options or {}
 
         if store_url.startswith(("s3://", "gs://", "az://")):
             print("⚠ Cannot add attributes to read-only remote stores")
             print("  Consider copying to a local store first")
+            if not report["has_consolidated"]:
+                print("\n→ Creating consolidated metadata...")
+                consolidate_metadata(store_url, storage_options)
             return
 
-        # Open store for writing
-        store = zarr.open_group(store_url, mode="r+")
+        missing_units = [
+            array_path
+            for array_path, info in report["arrays"].items()
+            if "No units specified" in str(info.get("issues", []))
+        ]
+        if missing_units:
+            updated = _add_missing_units(store_url, storage_options, missing_units, consolidated)
 
-        for array_path, info in report["arrays"].items():
-            if "No units specified" in str(info.get("issues", [])):
-                try:
-                    arr = store[array_path]
-                    arr.attrs["units"] = "unknown"
-                    print(f"  ✓ Added units attribute to {array_path}")
-                except Exception as e:
-                    print(f"  ✗ Failed to update {array_path}: {e}")
+    # Consolidate last so the consolidated metadata includes the new attributes
+    if not report["has_consolidated"]:
+        print("\n→ Creating consolidated metadata...")
+        if consolidated is not None:
+            # Validation already read every metadata document of the store,
+            # so write them out instead of reading them all again
+            for path in updated:
+                consolidated[f"{path}/.zattrs"] = {
+                    **consolidated.get(f"{path}/.zattrs", {}),
+                    "units": "unknown",
+                }
+            mapper = fsspec.get_mapper(store_url, **(storage_options or {}))
+            write_consolidated_metadata(mapper.fs, mapper.root.rstrip("/"), consolidated)
+            clear_metadata_cache(store_url)
+            print(f"✓ Consolidated metadata written to {store_url}/.zmetadata")
+        else:
+            consolidate_metadata(store_url, storage_options)
+    elif updated:
+        print("\n→ Refreshing consolidated metadata...")
+        consolidate_metadata(store_url, storage_options, force=True)
 
     print("\n✓ Repair complete")
+
+
+def _add_missing_units(
+    store_url: str,
+    storage_options: Optional[dict[str, Any]],
+    array_paths: list[str],
+    consolidated: Optional[dict[str, Any]] = None,
+) -> list[str]:
+    """Set ``units = "unknown"`` on arrays, writing every attribute document in one batch.
+
+    Setting ``arr.attrs[...]`` per array costs a read and a write of each
+    array's attributes in turn. Instead the current documents are fetched
+    with one batched ``cat``, updated in memory, and written back with one
+    batched ``pipe``, which async filesystems dispatch concurrently. Zarr v2
+    arrays keep their attributes in ``.zattrs``, v3 arrays in the
+    ``attributes`` field of ``zarr.json``.
+
+    Parameters
+    ----------
+    store_url : str
+        Path or URL to the Zarr store
+    storage_options : dict, optional
+        Additional storage options
+    array_paths : list of str
+        Paths of the arrays missing units
+    consolidated : dict, optional
+        Parsed ``metadata`` mapping of the store's .zmetadata. Arrays it
+        describes are known to be v2 arrays, so only their ``.zattrs`` is
+        fetched. Their attributes are always read from the store, since the
+        consolidated copy may be older.
+
+    Returns
+    -------
+    list of str
+        Paths of the arrays that were updated
+    """
+    mapper = fsspec.get_mapper(store_url, **(storage_options or {}))
+    fs, root = mapper.fs, mapper.root.rstrip("/")
+    consolidated = consolidated or {}
+
+    keys = []
+    for path in array_paths:
+        if f"{path}/.zarray" not in consolidated:
+            keys.append(f"{root}/{path}/zarr.json")
+        keys.append(f"{root}/{path}/.zattrs")
+    try:
+        docs = fs.cat(keys, on_error="omit")
+    except Exception as e:
+        print(f"  ✗ Failed to read attributes: {e}")
+        return []
+
+    updates = {}
+    for path in array_paths:
+        v3_key = f"{root}/{path}/zarr.json"
+        if v3_key in docs:
+            document = json_loads(docs[v3_key])
+            document.setdefault("attributes", {})["units"] = "unknown"
+            updates[v3_key] = json.dumps(document, indent=2).encode()
+        else:
+            v2_key = f"{root}/{path}/.zattrs"
+            attrs = json_loads(docs[v2_key]) if v2_key in docs else {}
+            attrs["units"] = "unknown"
+            updates[v2_key] = json.dumps(attrs, indent=4, sort_keys=True).encode()
+
+    try:
+        fs.pipe(updates)
+    except Exception as e:
+        for path in array_paths:
+            print(f"  ✗ Failed to update {path}: {e}")
+        return []
+
+    for path in array_paths:
+        print(f"  ✓ Added units attribute to {path}")
+    return array_paths
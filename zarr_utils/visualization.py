@@ -1,4 +1,5 @@
 import os
+from collections.abc import Iterable, Iterator
 
 import numpy as np
 import xarray as xr
@@ -8,8 +9,98 @@ try:
     from vtk.util import numpy_support
 
     HAS_VTK = True
+
+    # VTK array types for the NumPy dtypes VTK stores natively
+    _NP_TO_VTK = {
+        np.dtype("f4"): vtk.VTK_FLOAT,
+        np.dtype("f8"): vtk.VTK_DOUBLE,
+        np.dtype("i1"): vtk.VTK_SIGNED_CHAR,
+        np.dtype("u1"): vtk.VTK_UNSIGNED_CHAR,
+        np.dtype("i2"): vtk.VTK_SHORT,
+        np.dtype("u2"): vtk.VTK_UNSIGNED_SHORT,
+        np.dtype("i4"): vtk.VTK_INT,
+        np.dtype("u4"): vtk.VTK_UNSIGNED_INT,
+        np.dtype("i8"): vtk.VTK_LONG_LONG,
+        np.dtype("u8"): vtk.VTK_UNSIGNED_LONG_LONG,
+    }
 except ImportError:
     HAS_VTK = False
+    _NP_TO_VTK = {}
+
+
+def _vtk_scalars(data: xr.DataArray) -> tuple[np.ndarray, "vtk.vtkDataArray"]:
+    """Wrap the values of a 3D DataArray as a VTK array sharing their buffer.
+
+    VTK stores point data with x varying fastest, which is exactly the
+    C-order layout of a (z, y, x) array, so only a C-contiguous buffer is
+    needed and it can be shared with VTK instead of copied. The returned
+    NumPy array owns that buffer and must outlive the VTK array.
+    """
+    arr = np.ascontiguousarray(data)
+
+    # Get VTK data type
+    dtype = _NP_TO_VTK.get(arr.dtype)
+    if dtype is None:
+        try:
+            dtype = numpy_support.get_vtk_array_type(arr.dtype)
+        except TypeError:
+            # Fallback for unsupported types
+            arr = arr.astype(np.float32)
+            dtype = _NP_TO_VTK[arr.dtype]
+
+    vtk_array = numpy_support.numpy_to_vtk(arr.reshape(-1), deep=False, array_type=dtype)
+    vtk_array.SetName(data.name or "values")
+    return arr, vtk_array
+
+
+def _image_geometry(data: xr.DataArray) -> tuple[tuple[float, ...], list[float]]:
+    """Spacing and origin of a (z, y, x) DataArray, both in VTK's (x, y, z) order."""
+    # Extract spacing from coordinates or attributes
+    spacing = []
+    for dim in ["z", "y", "x"]:
+        if dim in data.coords and len(data.coords[dim]) > 1:
+            # Calculate spacing from coordinates
+            coord_vals = data.coords[dim].values
+            space = float(np.diff(coord_vals[:2])[0])
+            spacing.append(abs(space))  # Ensure positive spacing
+        else:
+            # Try to get from attributes
+            space = 1.0
+            if "voxel_spacing_nm" in data.attrs:
+                try:
+                    idx = ["z", "y", "x"].index(dim)
+                    space = float(data.attrs["voxel_spacing_nm"][idx]) * 1e-9
+                except (IndexError, ValueError, KeyError):
+                    pass
+            spacing.append(space)
+
+    # Set origin if available
+    origin = [0.0, 0.0, 0.0]
+    for i, dim in enumerate(["z", "y", "x"]):
+        if dim in data.coords and len(data.coords[dim]) > 0:
+            origin[i] = float(data.coords[dim].values[0])
+
+    return tuple(spacing[::-1]), origin[::-1]  # VTK uses x,y,z order
+
+
+def _add_field_data(img: "vtk.vtkImageData", attrs: dict) -> None:
+    """Attach numeric and string attributes to an image as field data.
+
+    Each attribute stays a separately named array, as readers look field
+    data up by name; InsertNextValue sizes and fills an array in one call.
+    """
+    field_data = img.GetFieldData()
+    for key, value in attrs.items():
+        if isinstance(value, (int, float)):
+            arr = vtk.vtkFloatArray()
+            arr.InsertNextValue(float(value))
+        elif isinstance(value, str):
+            arr = vtk.vtkStringArray()
+            arr.InsertNextValue(value)
+        else:
+            continue
+        arr.SetName(str(key))
+        field_data.AddArray(arr)
 
 
 def wrap_vtk(data: xr.DataArray) -> "vtk.vtkImageData":
@@ -39,76 +130,80 @@ def wrap_vtk(data: xr.DataArray) -> "vtk.vtkImageData":
     if data.ndim != 3:
         raise ValueError(f"Expected 3D array, got {data.ndim}D array with shape {data.shape}")
 
-    # Convert to Fortran-contiguous array for VTK
-    arr = np.asarray(data, order="F")
-
-    # Get VTK data type
-    try:
-        dtype = numpy_support.get_vtk_array_type(arr.dtype)
-    except TypeError:
-        # Fallback for unsupported types
-        arr = arr.astype(np.float32)
-        dtype = numpy_support.get_vtk_array_type(np.float32)
-
-    vtk_array = numpy_support.numpy_to_vtk(arr.ravel(order="F"), deep=True, array_type=dtype)
-
+    arr, vtk_array = _vtk_scalars(data)
     nz, ny, nx = arr.shape
-
-    # Extract spacing from coordinates or attributes
-    spacing = []
-    for dim in ["z", "y", "x"]:
-        if dim in data.coords and len(data.coords[dim]) > 1:
-            # Calculate spacing from coordinates
-            coord_vals = data.coords[dim].values
-            space = float(np.diff(coord_vals[:2])[0])
-            spacing.append(abs(space))  # Ensure positive spacing
-        else:
-            # Try to get from attributes
-            space = 1.0
-            if "voxel_spacing_nm" in data.attrs:
-                try:
-                    idx = ["z", "y", "x"].index(dim)
-                    space = float(data.attrs["voxel_spacing_nm"][idx]) * 1e-9
-                except (IndexError, ValueError, KeyError):
-                    pass
-            spacing.append(space)
-
-    spacing = tuple(spacing)
+    spacing, origin = _image_geometry(data)
 
     img = vtk.vtkImageData()
     img.SetDimensions(nx, ny, nz)
     img.SetSpacing(spacing)
-
-    # Set origin if available
-    origin = [0.0, 0.0, 0.0]
-    for i, dim in enumerate(["z", "y", "x"]):
-        if dim in data.coords and len(data.coords[dim]) > 0:
-            origin[i] = float(data.coords[dim].values[0])
-    img.SetOrigin(origin[::-1])  # VTK uses x,y,z order
+    img.SetOrigin(origin)
 
     img.GetPointData().SetScalars(vtk_array)
-    vtk_array.SetName(data.name or "values")
+    # VTK does not own the shared buffer, so keep the array alive with the image
+    img._np_ref = arr
 
     # Add metadata as field data
     if data.attrs:
-        field_data = img.GetFieldData()
-        for key, value in data.attrs.items():
-            if isinstance(value, (int, float)):
-                arr = vtk.vtkFloatArray()
-                arr.SetName(str(key))
-                arr.SetNumberOfTuples(1)
-                arr.SetValue(0, float(value))
-                field_data.AddArray(arr)
-            elif isinstance(value, str):
-                arr = vtk.vtkStringArray()
-                arr.SetName(str(key))
-                arr.SetNumberOfValues(1)
-                arr.SetValue(0, value)
-                field_data.AddArray(arr)
+        _add_field_data(img, data.attrs)
 
     return img
 
 
+def wrap_vtk_batch(dataarrays: Iterable[xr.DataArray]) -> Iterator["vtk.vtkImageData"]:
+    """
+    Convert a sequence of same-shaped DataArrays, e.g. time steps, to vtkImageData.
+
+    Dimensions, spacing, origin and field data are taken from the first
+    array and set up once on a single vtkImageData. For every array only the
+    point scalars are swapped, so the same image object is yielded each
+    time and must be used (rendered, written) before advancing.
+
+    Parameters
+    ----------
+    dataarrays : iterable of xr.DataArray
+        3D data arrays sharing one shape and grid.
+
+    Yields
+    ------
+    vtk.vtkImageData
+        The shared image holding the current array's values.
+
+    Raises
+    ------
+    ImportError
+        If VTK is not installed.
+    ValueError
+        If an array is not 3D or its shape differs from the first array's.
+    """
+    if not HAS_VTK:
+        raise ImportError("VTK is required for this function. Install with: pip install vtk")
+
+    img = None
+    shape = None
+    for data in dataarrays:
+        if data.ndim != 3:
+            raise ValueError(f"Expected 3D array, got {data.ndim}D array with shape {data.shape}")
+
+        if img is None:
+            shape = data.shape
+            nz, ny, nx = shape
+            spacing, origin = _image_geometry(data)
+            img = vtk.vtkImageData()
+            img.SetDimensions(nx, ny, nz)
+            img.SetSpacing(spacing)
+            img.SetOrigin(origin)
+            if data.attrs:
+                _add_field_data(img, data.attrs)
+        elif data.shape != shape:
+            raise ValueError(f"Expected shape {shape}, got {data.shape}")
+
+        arr, vtk_array = _vtk_scalars(data)
+        img.GetPointData().SetScalars(vtk_array)
+        img._np_ref = arr
+        yield img
+
+
 def to_vtk(data: xr.DataArray, output_path: str, binary: bool = True) -> None:
     """
     Convert and write xarray DataArray as legacy .vtk file.
@@ -149,11 +244,23 @@ def to_vtk(data: xr.DataArray, output_path: str, binary: bool = True) -> None:
     writer.Write()
 
 
-def to_vti(data: xr.DataArray, output_path: str, compression: bool = True) -> None:
+# Compressors of vtkXMLImageDataWriter by name, with the setter selecting each
+_VTI_COMPRESSORS = {
+    "zlib": "SetCompressorTypeToZLib",
+    "lz4": "SetCompressorTypeToLZ4",
+    "lzma": "SetCompressorTypeToLZMA",
+}
+
+
+def to_vti(
+    data: xr.DataArray, output_path: str, compression: bool = True, compressor: str = "zlib"
+) -> None:
     """
     Convert and write xarray DataArray as XML VTK ImageData (.vti) file.
 
-    VTI format is more modern than legacy VTK and supports compression.
+    VTI format is more modern than legacy VTK and supports compression. The
+    data is written as raw appended binary rather than base64 encoded, which
+    keeps large volumes smaller and faster to write.
 
     Parameters
     ----------
@@ -163,16 +270,23 @@ def to_vti(data: xr.DataArray, output_path: str, compression: bool = True) -> No
         File path ending in .vti.
     compression : bool, optional
         Enable compression (default: True).
+    compressor : str, optional
+        Compressor used when compression is enabled: "zlib" (default),
+        "lz4" (faster) or "lzma" (smaller).
 
     Raises
     ------
     ValueError
-        If output path doesn't end with .vti
+        If output path doesn't end with .vti or the compressor is unknown
     ImportError
         If VTK is not installed
     """
     if not output_path.endswith(".vti"):
         raise ValueError("Output path must end in '.vti'")
+    if compressor not in _VTI_COMPRESSORS:
+        raise ValueError(
+            f"Unknown compressor '{compressor}', expected one of {sorted(_VTI_COMPRESSORS)}"
+        )
 
     img = wrap_vtk(data)
 
@@ -182,9 +296,11 @@ def to_vti(data: xr.DataArray, output_path: str, compression: bool = True) -> No
     writer = vtk.vtkXMLImageDataWriter()
     writer.SetFileName(output_path)
     writer.SetInputData(img)
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
 
     if compression:
-        writer.SetCompressorTypeToZLib()
+        getattr(writer, _VTI_COMPRESSORS[compressor])()
     else:
         writer.SetCompressorTypeToNone()
 
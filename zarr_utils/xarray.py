@@ -1,3 +1,4 @@
+import functools
 from typing import Any, Optional, Union
 
 import numpy as np
@@ -6,6 +7,44 @@ import zarr
 
 from .compat import open_array_with_storage_options, open_group_with_storage_options
 
+try:
+    from xarray.indexes import RangeIndex
+except ImportError:  # xarray < 2025.06
+    RangeIndex = None
+
+# Spatial dimensions longer than this get lazily computed coordinates
+_LAZY_COORD_SIZE = 2**20
+
+
+def _spacing_triplet(value: Any) -> Optional[tuple[float, float, float]]:
+    """Return ``value`` as a (z, y, x) float tuple, or None if it has the wrong length."""
+    if len(value) == 3:
+        return tuple(float(s) for s in value)
+    return None
+
+
+def _pixel_resolution_spacing(value: Any) -> Optional[tuple[float, float, float]]:
+    """Read spacing from a ``pixelResolution`` attribute, e.g. {"dimensions": [z, y, x]}."""
+    if isinstance(value, dict) and "dimensions" in value:
+        return _spacing_triplet(value["dimensions"])
+    return None
+
+
+# Whole-triple spacing attributes, in priority order, with the function that
+# extracts the spacing from each
+_SPACING_EXTRACTORS = (
+    ("pixelResolution", _pixel_resolution_spacing),
+    ("spacing", _spacing_triplet),
+    ("resolution", _spacing_triplet),
+    ("voxel_size", _spacing_triplet),
+    ("voxelSize", _spacing_triplet),
+)
+
+# Per-axis spacing attributes for z, y and x, each in priority order
+_AXIS_SPACING_KEYS = tuple(
+    (f"{axis}_spacing", f"{axis}_resolution", f"{axis}Resolution") for axis in "zyx"
+)
+
 
 def get_voxel_spacing(
     zarr_obj: Union[zarr.Array, zarr.Group], default: tuple[float, float, float] = (1.0, 1.0, 1.0)
@@ -25,45 +64,84 @@ def get_voxel_spacing(
     tuple[float, float, float]
         Spacing in nanometers: (z, y, x)
     """
-    # Check for common metadata formats
-    attrs = zarr_obj.attrs
+    # Take one snapshot of the attributes; lookups on zarr's attribute
+    # objects may go back to the store
+    return _spacing_from_attrs(dict(zarr_obj.attrs), default)
 
-    # Format 1: pixelResolution.dimensions
-    if "pixelResolution" in attrs and isinstance(attrs["pixelResolution"], dict):
-        if "dimensions" in attrs["pixelResolution"]:
-            try:
-                spacing = attrs["pixelResolution"]["dimensions"]
-                if len(spacing) == 3:
-                    return tuple(float(s) for s in spacing)
-            except (ValueError, TypeError):
-                pass
 
-    # Format 2: Direct spacing/resolution attributes
-    for key in ["spacing", "resolution", "voxel_size", "voxelSize"]:
+def _spacing_from_attrs(
+    attrs: dict[str, Any], default: tuple[float, float, float] = (1.0, 1.0, 1.0)
+) -> tuple[float, float, float]:
+    """Extract spacing from a mapping of attributes, as in get_voxel_spacing."""
+    # Formats 1 and 2: pixelResolution.dimensions or a direct spacing attribute
+    for key, extract in _SPACING_EXTRACTORS:
         if key in attrs:
             try:
-                spacing = attrs[key]
-                if len(spacing) == 3:
-                    return tuple(float(s) for s in spacing)
+                spacing = extract(attrs[key])
             except (ValueError, TypeError):
-                pass
+                continue
+            if spacing is not None:
+                return spacing
 
     # Format 3: Individual axis attributes
     try:
         spacing = []
-        for axis in ["z", "y", "x"]:
-            for key in [f"{axis}_spacing", f"{axis}_resolution", f"{axis}Resolution"]:
-                if key in attrs:
-                    spacing.append(float(attrs[key]))
-                    break
-        if len(spacing) == 3:
-            return tuple(spacing)
+        for keys in _AXIS_SPACING_KEYS:
+            value = next((attrs[key] for key in keys if key in attrs), None)
+            if value is None:
+                return default
+            spacing.append(float(value))
+        return tuple(spacing)
     except (ValueError, TypeError):
         pass
 
     return default
 
 
+def _make_coord(dim: str, size: int, scale: float, dtype: np.dtype) -> np.ndarray:
+    """Build the read-only coordinate array of one dimension for _make_coords."""
+    if dim == "c":
+        coord = np.arange(size)  # Channel numbers
+    else:
+        # Scale in place so no second full-length array is allocated
+        coord = np.arange(size, dtype=dtype)
+        coord *= dtype.type(scale)
+    coord.setflags(write=False)
+    return coord
+
+
+@functools.lru_cache(maxsize=64)
+def _make_coords(
+    dims: tuple[str, ...],
+    shape: tuple[int, ...],
+    spacing_nm: tuple[float, ...],
+    dtype: np.dtype = np.dtype(np.float64),
+) -> dict[str, np.ndarray]:
+    """Build physical coordinates (in meters) for each dimension of a grid.
+
+    Arrays in a store often share a grid, so results are cached and the
+    coordinate arrays are made read-only as they are shared between datasets.
+    Spatial coordinates have the given floating point ``dtype``; channel
+    dimensions get plain channel numbers.
+    """
+    # Convert nm → meters once per axis rather than once per element
+    scales = [float(scale) for scale in np.asarray(spacing_nm, dtype=np.float64) * 1e-9]
+    return {
+        dim: _make_coord(dim, size, scale, dtype) for dim, size, scale in zip(dims, shape, scales)
+    }
+
+
+def _range_coords(dim: str, size: int, spacing_nm: float, dtype: np.dtype) -> xr.Coordinates:
+    """Physical coordinates (in meters) of a dimension, computed on access.
+
+    A RangeIndex only stores its start, stop and size, so long axes do not
+    allocate their coordinate values up front.
+    """
+    stop = (size - 1) * spacing_nm * 1e-9
+    index = RangeIndex.linspace(0.0, stop, num=size, dim=dim, dtype=dtype)
+    return xr.Coordinates.from_xindex(index)
+
+
 def open_xarray(
     store_url: str,
     group: str,
@@ -71,6 +149,7 @@ def open_xarray(
     anon: bool = True,
     with_coords: bool = True,
     storage_options: Optional[dict[str, Any]] = None,
+    coord_dtype: Union[str, np.dtype, type] = np.float64,
 ) -> xr.Dataset:
     """
     Open a 3D Zarr array as an xarray.Dataset with optional physical coordinates.
@@ -87,6 +166,12 @@ def open_xarray(
         If using remote object store (S3), use anonymous access
     with_coords : bool
         If True, attach real-world coordinates (in meters) using pixel spacing
+    storage_options : dict, optional
+        Additional storage options, merged over ``anon``
+    coord_dtype : dtype, optional
+        Floating point type of the physical coordinates (default: float64).
+        float32 halves their memory for very long axes, at the cost of
+        precision beyond about 16 million samples per axis.
 
     Returns
     -------
@@ -150,7 +235,8 @@ def open_xarray(
     else:
         raise ValueError(f"Unsupported array dimensionality: {ndim}D (shape: {shape})")
 
-    spacing_nm = get_voxel_spacing(z)
+    attrs = dict(z.attrs)
+    spacing_nm = _spacing_from_attrs(attrs)
 
     # Extend spacing for higher dimensions
     if ndim == 4:
@@ -159,23 +245,30 @@ def open_xarray(
         spacing_nm = spacing_nm[1:]  # Only y, x spacing
 
     coords = {}
+    lazy = []
     if with_coords:
-        if ndim == 2:
-            # For 2D arrays, manually handle y and x
-            coords["y"] = np.arange(shape[0]) * spacing_nm[0] * 1e-9
-            coords["x"] = np.arange(shape[1]) * spacing_nm[1] * 1e-9
-        else:
-            for i, (dim, size) in enumerate(zip(dims, shape)):
-                if dim == "c":
-                    coords[dim] = np.arange(size)  # Channel numbers
-                else:
-                    # Get appropriate spacing
-                    spacing_idx = i
-                    spacing = spacing_nm[spacing_idx] if spacing_idx < len(spacing_nm) else 1.0
-                    coords[dim] = np.arange(size) * spacing * 1e-9  # convert nm → meters
+        dtype = np.dtype(coord_dtype)
+        if dtype.kind != "f":
+            raise ValueError(f"coord_dtype must be a floating point type, got {dtype}")
+        if RangeIndex is not None:
+            lazy = [i for i, size in enumerate(shape) if dims[i] != "c" and size > _LAZY_COORD_SIZE]
+        eager = [i for i in range(ndim) if i not in lazy]
+        # Copy so the cached mapping itself is never handed out
+        coords = dict(
+            _make_coords(
+                tuple(dims[i] for i in eager),
+                tuple(shape[i] for i in eager),
+                tuple(spacing_nm[i] for i in eager),
+                dtype,
+            )
+        )
+        if lazy:
+            coords = xr.Coordinates(coords)
+            for i in lazy:
+                coords = coords.assign(_range_coords(dims[i], shape[i], spacing_nm[i], dtype))
 
     # Create DataArray with chunking information
-    da = xr.DataArray(z, dims=dims, coords=coords if with_coords else None, attrs=dict(z.attrs))
+    da = xr.DataArray(z, dims=dims, coords=coords if with_coords else None, attrs=attrs)
 
     # Add z dimension if needed (for 2D arrays)
     if ndim == 2 and needs_z_dim: